@@ -0,0 +1,223 @@
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from models import ArchivedPost, Comment, CoverageRollup, Post, Query, Subreddit, User
+
+# ------------------------------------------------------------
+# Coverage rollups
+#
+# Counters per day x subreddit x persona x query, updated from
+# save_generated_week_to_db so coverage reads never scan posts/comments.
+# ------------------------------------------------------------
+
+RollupKey = Tuple[date, int, int, Optional[int]]
+
+GROUP_COLUMNS = {
+    "day": CoverageRollup.day,
+    "subreddit": Subreddit.name,
+    "persona": User.username,
+    "query": Query.text,
+}
+
+
+def _new_delta() -> Dict[str, int]:
+    return {"posts": 0, "comments": 0, "depth_sum": 0, "max_depth": 0}
+
+
+def thread_coverage_deltas(
+    post: Post,
+    comments: Iterable[Tuple[int, int]],
+) -> Dict[RollupKey, Dict[str, int]]:
+    """
+    Deltas for one saved thread. `comments` is (user_id, depth) per comment.
+    """
+    day = (post.created_at or datetime.utcnow()).date()
+    deltas: Dict[RollupKey, Dict[str, int]] = defaultdict(_new_delta)
+
+    deltas[(day, post.subreddit_id, post.user_id, post.query_id)]["posts"] += 1
+
+    for user_id, depth in comments:
+        d = deltas[(day, post.subreddit_id, user_id, post.query_id)]
+        d["comments"] += 1
+        d["depth_sum"] += depth
+        d["max_depth"] = max(d["max_depth"], depth)
+
+    return deltas
+
+
+def _greatest(db: Session, column, value: int):
+    # SQLite's scalar max() is GREATEST() everywhere else
+    if db.bind.dialect.name == "sqlite":
+        return func.max(column, value)
+    return func.greatest(column, value)
+
+
+def apply_coverage_deltas(db: Session, deltas: Dict[RollupKey, Dict[str, int]]) -> None:
+    """
+    Upsert rollup rows. Increments are done in SQL so concurrent savers don't lose counts.
+    """
+    for (day, subreddit_id, user_id, query_id), d in deltas.items():
+        key = dict(day=day, subreddit_id=subreddit_id, user_id=user_id, query_id=query_id)
+
+        row = db.query(CoverageRollup).filter_by(**key).first()
+        if row is None:
+            try:
+                db.add(CoverageRollup(**key, **_new_delta()))
+                db.commit()
+            except IntegrityError:
+                # Another writer created it first; use theirs
+                db.rollback()
+            row = db.query(CoverageRollup).filter_by(**key).one()
+
+        db.query(CoverageRollup).filter_by(id=row.id).update(
+            {
+                CoverageRollup.posts: CoverageRollup.posts + d["posts"],
+                CoverageRollup.comments: CoverageRollup.comments + d["comments"],
+                CoverageRollup.depth_sum: CoverageRollup.depth_sum + d["depth_sum"],
+                CoverageRollup.max_depth: _greatest(db, CoverageRollup.max_depth, d["max_depth"]),
+            },
+            synchronize_session=False,
+        )
+    db.commit()
+
+
+def comment_depths(comments: List[Comment]) -> Dict[int, int]:
+    """
+    Depth per comment id (top-level = 1) for comments of one post.
+    """
+    by_id = {c.id: c for c in comments}
+    depths: Dict[int, int] = {}
+
+    def depth(c: Comment) -> int:
+        if c.id not in depths:
+            parent = by_id.get(c.parent_comment_id)
+            depths[c.id] = 1 if parent is None else depth(parent) + 1
+        return depths[c.id]
+
+    for c in comments:
+        depth(c)
+    return depths
+
+
+def rebuild_floor(db: Session) -> Optional[date]:
+    """
+    First day rebuild_coverage_rollups may recount: the day after the newest
+    archived week (those threads can no longer be recounted), else the oldest
+    hot post's day. None when there is nothing to recount.
+    """
+    newest_archived = db.query(func.max(ArchivedPost.week_bucket)).scalar()
+    if newest_archived is not None:
+        return newest_archived + timedelta(days=7)
+
+    oldest = db.query(func.min(Post.created_at)).scalar()
+    return oldest.date() if oldest is not None else None
+
+
+def rebuild_coverage_rollups(db: Session) -> int:
+    """
+    Recompute rollups from posts/comments (backfill or repair). Returns rows written.
+    Rollups before rebuild_floor() are left alone.
+    """
+    floor = rebuild_floor(db)
+    if floor is None:
+        return 0
+
+    db.query(CoverageRollup).filter(CoverageRollup.day >= floor).delete(synchronize_session=False)
+    db.commit()
+
+    floor_start = datetime.combine(floor, datetime.min.time())
+    total: Dict[RollupKey, Dict[str, int]] = defaultdict(_new_delta)
+    for post in db.query(Post).filter(Post.created_at >= floor_start).yield_per(500):
+        comments = db.query(Comment).filter_by(post_id=post.id).all()
+        depths = comment_depths(comments)
+        deltas = thread_coverage_deltas(post, [(c.user_id, depths[c.id]) for c in comments])
+        for key, d in deltas.items():
+            t = total[key]
+            t["posts"] += d["posts"]
+            t["comments"] += d["comments"]
+            t["depth_sum"] += d["depth_sum"]
+            t["max_depth"] = max(t["max_depth"], d["max_depth"])
+
+    for (day, subreddit_id, user_id, query_id), d in total.items():
+        db.add(CoverageRollup(
+            day=day, subreddit_id=subreddit_id, user_id=user_id, query_id=query_id, **d
+        ))
+    db.commit()
+    return len(total)
+
+
+def query_coverage(
+    db: Session,
+    group_by: List[str],
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    subreddit: Optional[str] = None,
+    persona: Optional[str] = None,
+) -> List[Dict]:
+    """
+    Aggregate rollups over [start, end], grouped by any of day/subreddit/persona/query.
+    """
+    unknown = [g for g in group_by if g not in GROUP_COLUMNS]
+    if unknown:
+        raise ValueError(f"Unknown group_by field(s): {', '.join(unknown)}")
+
+    columns = [GROUP_COLUMNS[g].label(g) for g in group_by]
+    q = (
+        db.query(
+            *columns,
+            func.sum(CoverageRollup.posts).label("posts"),
+            func.sum(CoverageRollup.comments).label("comments"),
+            func.sum(CoverageRollup.depth_sum).label("depth_sum"),
+            func.max(CoverageRollup.max_depth).label("max_depth"),
+        )
+        .select_from(CoverageRollup)
+        .join(Subreddit, Subreddit.id == CoverageRollup.subreddit_id)
+        .join(User, User.id == CoverageRollup.user_id)
+        .outerjoin(Query, Query.id == CoverageRollup.query_id)
+    )
+
+    if start:
+        q = q.filter(CoverageRollup.day >= start)
+    if end:
+        q = q.filter(CoverageRollup.day <= end)
+    if subreddit:
+        q = q.filter(Subreddit.name == subreddit.replace("r/", ""))
+    if persona:
+        q = q.filter(User.username == persona)
+
+    if columns:
+        keys = [GROUP_COLUMNS[g] for g in group_by]
+        q = q.group_by(*keys).order_by(*keys)
+
+    out = []
+    for row in q.all():
+        data = row._asdict()
+        comments = data["comments"] or 0
+        data["posts"] = data["posts"] or 0
+        data["comments"] = comments
+        data["avg_depth"] = round((data.pop("depth_sum") or 0) / comments, 3) if comments else 0.0
+        data["max_depth"] = data["max_depth"] or 0
+        out.append(data)
+    return out
+
+
+if __name__ == "__main__":
+    import sys
+
+    from database import SessionLocal
+
+    if sys.argv[1:] != ["--rebuild"]:
+        print("Usage: python analytics.py --rebuild")
+        sys.exit(1)
+
+    session = SessionLocal()
+    try:
+        written = rebuild_coverage_rollups(session)
+    finally:
+        session.close()
+    print(f"Rebuilt {written} coverage rollup rows.")
@@ -1,6 +1,8 @@
 from database import engine
 from models import Base
+from retention import ensure_week_buckets
 
-print("Creating MySQL tables...")
+print("Creating tables (if missing)...")
 Base.metadata.create_all(bind=engine)
+ensure_week_buckets(engine)
 print("Done!")
@@ -0,0 +1,294 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+# ------------------------------------------------------------
+# Load test for the read API
+#
+# Seeds a throwaway database with a synthetic corpus through the
+# models, then drives the FastAPI app in-process with many concurrent
+# clients. Runs fully offline (no LLM, no network).
+#
+#   python loadtest.py --clients 32 --requests 2000
+#   python loadtest.py --json out.json
+#   python loadtest.py --baseline out.json --max-regression 0.25
+# ------------------------------------------------------------
+
+ENDPOINTS = ("subreddits", "subreddit_posts", "post")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Concurrent load test for the read endpoints.")
+    parser.add_argument("--db-url", help="SQLAlchemy URL (default: fresh SQLite file in a temp dir)")
+    parser.add_argument("--reuse-db", action="store_true", help="Skip seeding; use --db-url as is")
+    parser.add_argument("--subreddits", type=int, default=20)
+    parser.add_argument("--posts-per-subreddit", type=int, default=50)
+    parser.add_argument("--comments-per-post", type=int, default=30)
+    parser.add_argument("--max-depth", type=int, default=6)
+    parser.add_argument("--personas", type=int, default=10)
+    parser.add_argument("--clients", type=int, default=16, help="Concurrent clients per endpoint")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", dest="json_out", help="Write results to this file")
+    parser.add_argument("--baseline", help="Compare against a previous --json result")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Allowed p95 latency / query-count growth vs baseline (0.25 = 25%%)")
+    return parser.parse_args(argv)
+
+
+# ------------------------------------------------------------
+# Synthetic corpus
+# ------------------------------------------------------------
+
+def seed_database(db, args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Insert subreddits, personas, queries, posts and deep comment trees.
+    Posts and comments get explicit ids so whole trees can be bulk-inserted.
+    """
+    from sqlalchemy import func, insert, text
+
+    from models import Comment, Post, Query, Subreddit, User
+
+    rng = random.Random(args.seed)
+    now = datetime.utcnow()
+
+    subs = [Subreddit(name=f"loadtest_{i}", title=f"r/loadtest_{i}") for i in range(args.subreddits)]
+    users = [User(username=f"persona_{i}") for i in range(args.personas)]
+    queries = [Query(text=f"load test query {i}") for i in range(max(args.subreddits, 1))]
+    db.add_all(subs + users + queries)
+    db.flush()
+
+    next_post = (db.query(func.max(Post.id)).scalar() or 0) + 1
+    next_comment = (db.query(func.max(Comment.id)).scalar() or 0) + 1
+
+    post_rows, comment_rows = [], []
+    for sub in subs:
+        for _ in range(args.posts_per_subreddit):
+            q = rng.choice(queries)
+            created = now - timedelta(minutes=rng.randrange(60 * 24 * 90))
+            post_rows.append({
+                "id": next_post,
+                "subreddit_id": sub.id,
+                "user_id": rng.choice(users).id,
+                "query_id": q.id,
+                "query_text": q.text,
+                "title": f"Synthetic post {next_post} about slides",
+                "body": "Lorem ipsum slide deck question. " * rng.randint(3, 12),
+                "created_at": created,
+            })
+
+            depths: Dict[int, int] = {}
+            for _ in range(args.comments_per_post):
+                candidates = [cid for cid, d in depths.items() if d < args.max_depth]
+                parent = rng.choice(candidates) if candidates and rng.random() < 0.7 else None
+                depths[next_comment] = depths.get(parent, 0) + 1
+                comment_rows.append({
+                    "id": next_comment,
+                    "post_id": next_post,
+                    "user_id": rng.choice(users).id,
+                    "parent_comment_id": parent,
+                    "text": "Synthetic reply text. " * rng.randint(1, 5),
+                    "created_at": created,
+                })
+                next_comment += 1
+            next_post += 1
+
+    if post_rows:
+        db.execute(insert(Post), post_rows)
+    # Parents always precede children, so chunked inserts keep FKs valid
+    for i in range(0, len(comment_rows), 5000):
+        db.execute(insert(Comment), comment_rows[i:i + 5000])
+
+    # Explicit ids bypass Postgres sequences; move them past the seeded rows
+    if db.bind.dialect.name == "postgresql":
+        for table in ("posts", "comments"):
+            db.execute(text(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"
+            ))
+    db.commit()
+
+    return {
+        "subreddits": [s.name for s in subs],
+        "post_ids": [row["id"] for row in post_rows],
+        "comments": len(comment_rows),
+    }
+
+
+def existing_corpus(db) -> Dict[str, Any]:
+    from models import Comment, Post, Subreddit
+
+    return {
+        "subreddits": [name for (name,) in db.query(Subreddit.name).all()],
+        "post_ids": [pid for (pid,) in db.query(Post.id).all()],
+        "comments": db.query(Comment).count(),
+    }
+
+
+# ------------------------------------------------------------
+# Driver
+# ------------------------------------------------------------
+
+class QueryCounter:
+    """
+    Counts SQL statements executed on the engine.
+    """
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        self._lock = threading.Lock()
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        with self._lock:
+            self.count += 1
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+async def run_endpoint(app, paths: List[str], clients: int, counter: QueryCounter) -> Dict[str, Any]:
+    import httpx
+
+    latencies: List[float] = []
+    errors = 0
+    cursor = iter(paths)
+    lock = asyncio.Lock()
+
+    async def client_loop(client):
+        nonlocal errors
+        while True:
+            async with lock:
+                path = next(cursor, None)
+            if path is None:
+                return
+            started = time.perf_counter()
+            resp = await client.get(path)
+            latencies.append(time.perf_counter() - started)
+            if resp.status_code != 200:
+                errors += 1
+
+    transport = httpx.ASGITransport(app=app)
+    queries_before = counter.count
+    started = time.perf_counter()
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+        await asyncio.gather(*(client_loop(client) for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    n = len(latencies)
+    return {
+        "requests": n,
+        "errors": errors,
+        "rps": round(n / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        "queries_per_request": round((counter.count - queries_before) / n, 2) if n else 0.0,
+    }
+
+
+def endpoint_paths(corpus: Dict[str, Any], requests: int, rng: random.Random) -> Dict[str, List[str]]:
+    subs, posts = corpus["subreddits"], corpus["post_ids"]
+    return {
+        "subreddits": ["/subreddits"] * requests,
+        "subreddit_posts": [f"/subreddit/{rng.choice(subs)}/posts" for _ in range(requests)] if subs else [],
+        "post": [f"/post/{rng.choice(posts)}" for _ in range(requests)] if posts else [],
+    }
+
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any], allowed: float) -> List[str]:
+    problems = []
+    for name, row in results["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(name)
+        if not base:
+            continue
+        for metric in ("p95_ms", "queries_per_request"):
+            if base[metric] and row[metric] > base[metric] * (1 + allowed):
+                problems.append(f"{name}: {metric} {base[metric]} -> {row[metric]}")
+        if row["errors"] > base.get("errors", 0):
+            problems.append(f"{name}: errors {base.get('errors', 0)} -> {row['errors']}")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+
+    db_url = args.db_url
+    if db_url is None:
+        db_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="ogtool-loadtest-"), "load.db")
+    # database.py reads this at import time
+    os.environ["DATABASE_URL"] = db_url
+    os.environ.pop("DATABASE_URL_INTERNAL", None)
+
+    import database
+    import main as api
+    from models import Base
+
+    database.engine.echo = False
+    Base.metadata.create_all(bind=database.engine)
+
+    db = database.SessionLocal()
+    try:
+        started = time.perf_counter()
+        corpus = existing_corpus(db) if args.reuse_db else seed_database(db, args)
+        seed_s = time.perf_counter() - started
+    finally:
+        db.close()
+
+    print(
+        f"Corpus: {len(corpus['subreddits'])} subreddits, {len(corpus['post_ids'])} posts, "
+        f"{corpus['comments']} comments (seeded in {seed_s:.1f}s) -> {db_url}"
+    )
+
+    counter = QueryCounter(database.engine)
+    paths = endpoint_paths(corpus, args.requests, random.Random(args.seed))
+
+    results: Dict[str, Any] = {"config": vars(args), "endpoints": {}}
+    for name in ENDPOINTS:
+        if not paths[name]:
+            continue
+        row = asyncio.run(run_endpoint(api.app, paths[name], args.clients, counter))
+        results["endpoints"][name] = row
+        print(
+            f"{name:<16} rps={row['rps']:<8} p50={row['p50_ms']}ms p95={row['p95_ms']}ms "
+            f"p99={row['p99_ms']}ms max={row['max_ms']}ms errors={row['errors']} "
+            f"queries/req={row['queries_per_request']}"
+        )
+
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=4)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            problems = compare_to_baseline(results, json.load(f), args.max_regression)
+        if problems:
+            print("\nREGRESSIONS:")
+            for p in problems:
+                print(f"  {p}")
+            return 1
+        print("\nNo regressions against baseline.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,25 +1,41 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
+from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel, Field
 from datetime import date, timedelta
 from typing import Optional
 import os
+import hashlib
 import json
+import threading
 
 # ----------------------------
 # DB + Models
 # ----------------------------
 from database import SessionLocal, engine
-from models import User, Subreddit, Post, Comment, Query, Base
+from models import User, Subreddit, Post, Comment, IdempotencyRecord, Base
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from analytics import query_coverage
+from persistence import save_generated_week_to_db
+from retention import idempotency_cutoff, load_archived_thread
+from run_manifest import config_hash
+from singleflight import SingleFlight
 
 # ----------------------------
 # Planning Engine
 # ----------------------------
 from planning_engine import (
+    estimate_thread_floor,
     load_config,
     generate_conversation_calendar,
-    LargeLangModel as GroqLLM,
+    new_seed,
+    placement_snapshot_for,
+    plan_week,
+    tiered_llm_from_config,
 )
+from task_queue import batch_status, enqueue_assignments
+
+from output_validation import STATS as VALIDATION_STATS
 
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -53,7 +69,23 @@ try:
 except Exception as e:
     raise RuntimeError(f"Failed to load config from {CONFIG_PATH}: {e}")
 
-LLM = GroqLLM()
+# The LLM (and with it the provider SDKs) is built on the first generation
+# request, so read-only replicas never pay for it.
+_LLM = None
+_LLM_LOCK = threading.Lock()
+
+
+def get_llm():
+    global _LLM
+    if _LLM is None:
+        with _LLM_LOCK:
+            if _LLM is None:
+                _LLM = tiered_llm_from_config(CONFIG)
+    return _LLM
+
+
+# Thread runner: "langgraph" (default) or "native"
+ENGINE = os.environ.get("OGTOOL_ENGINE") or CONFIG.get("engine", "langgraph")
 
 
 # ------------------------------------------------------------
@@ -64,56 +96,29 @@ class WeekRequest(BaseModel):
     start_date: Optional[date] = None
     max_comments_per_thread: int = Field(default=6, ge=1, le=30)
     override_posts_per_week: Optional[int] = None
+    seed: Optional[int] = None
+    token_budget: Optional[int] = Field(default=None, ge=1)
 
 
 class MultiWeekRequest(BaseModel):
     num_weeks: int = Field(..., ge=1, le=52)
     output_dir: str = Field(default="output_weeks")
     max_comments_per_thread: int = 6
+    seed: Optional[int] = None
 
 
 # ------------------------------------------------------------
 # Helper DB Functions
 # ------------------------------------------------------------
 
-# Create tables at startup (ONLY if they don't exist)
+# Schema creation is a deploy step (`python create_tables.py`), not a boot step.
+# Set OGTOOL_AUTO_CREATE_TABLES=1 to keep the old behaviour for local dev.
 @app.on_event("startup")
 def on_startup():
-    print("Checking & creating tables if needed...")
-    Base.metadata.create_all(bind=engine)
-    print("Database ready.")
-
-def get_or_create_user(db: Session, username: str):
-    user = db.query(User).filter_by(username=username).first()
-    if not user:
-        user = User(username=username)
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-    return user
-
-
-def get_or_create_subreddit(db: Session, name: str):
-    clean = name.replace("r/", "")
-    subreddit = db.query(Subreddit).filter_by(name=clean).first()
-    if not subreddit:
-        subreddit = Subreddit(name=clean, title=f"r/{clean}")
-        db.add(subreddit)
-        db.commit()
-        db.refresh(subreddit)
-    return subreddit
-
-
-def get_or_create_query(db: Session, query_text: str):
-    """Create or fetch query row."""
-    q = db.query(Query).filter_by(text=query_text).first()
-    if not q:
-        q = Query(text=query_text)
-        db.add(q)
-        db.commit()
-        db.refresh(q)
-    return q
-
+    if os.environ.get("OGTOOL_AUTO_CREATE_TABLES") == "1":
+        print("Checking & creating tables if needed...")
+        Base.metadata.create_all(bind=engine)
+        print("Database ready.")
 
 def build_comment_tree(comments):
     comment_map = {c.id: c for c in comments}
@@ -134,69 +139,72 @@ def build_comment_tree(comments):
 
 
 # ------------------------------------------------------------
-# Save generated week to DB
+# Keyword -> subreddit relevance index (built once, updated incrementally)
 # ------------------------------------------------------------
 
-def save_generated_week_to_db(db: Session, week_json: list):
+_RELEVANCE = None
+_RELEVANCE_LOCK = threading.Lock()
+
+
+def load_relevance_corpus(db: Session):
     """
-    Inserts generated JSON into DB:
-    - queries
-    - subreddits
-    - posts
-    - users
-    - threaded comments
+    Past post text and descriptions per subreddit, straight from the DB.
     """
+    corpus = {}
+    rows = (
+        db.query(Subreddit.name, Post.title, Post.body, Post.query_text)
+        .join(Post, Post.subreddit_id == Subreddit.id)
+        .all()
+    )
+    for name, title, body, query_text in rows:
+        corpus.setdefault(name, []).extend([title, body, query_text])
+
+    descriptions = {
+        name: description
+        for name, description in db.query(Subreddit.name, Subreddit.description).all()
+        if description
+    }
+    return corpus, descriptions
 
-    for entry in week_json:
-        subreddit_name = entry["subreddit"]
-        post_data = entry["post"]
-        comments_data = entry["comments"]
-
-        # Subreddit
-        subreddit = get_or_create_subreddit(db, subreddit_name)
-
-        # User
-        author = get_or_create_user(db, post_data["author"])
-
-        # Query (NEW)
-        query_row = get_or_create_query(db, post_data["query"])
-
-        # Post
-        post = Post(
-            subreddit_id=subreddit.id,
-            user_id=author.id,
-            title=post_data["title"],
-            body=post_data["body"],
-            query_id=query_row.id,         # <-- NEW
-            query_text=post_data["query"]  # <-- NEW (optional convenience field)
-        )
-        db.add(post)
-        db.commit()
-        db.refresh(post)
 
-        # Comments
-        comment_map = {}
+def get_relevance_index():
+    global _RELEVANCE
+    if _RELEVANCE is None:
+        with _RELEVANCE_LOCK:
+            if _RELEVANCE is None:
+                from relevance import relevance_index_from_config
 
-        for c in comments_data:
-            comment_author = get_or_create_user(db, c["author"])
+                db = SessionLocal()
+                try:
+                    corpus, descriptions = load_relevance_corpus(db)
+                finally:
+                    db.close()
+                _RELEVANCE = relevance_index_from_config(CONFIG, corpus, descriptions)
+    return _RELEVANCE
 
-            parent_db_id = (
-                comment_map[c["parent_comment_id"]].id
-                if c["parent_comment_id"] in comment_map
-                else None
-            )
 
-            comment = Comment(
-                post_id=post.id,
-                user_id=comment_author.id,
-                parent_comment_id=parent_db_id,
-                text=c["text"]
-            )
-            db.add(comment)
-            db.commit()
-            db.refresh(comment)
+def current_placements(cfg: dict):
+    """
+    Freeze today's keyword -> subreddit probabilities for one run. The index
+    keeps learning from saved posts, so a seed alone only reproduces a run
+    together with this snapshot (its hash is returned as `placements`).
+    """
+    if (cfg.get("placement") or {}).get("mode", "relevance") != "relevance":
+        return None
+    return placement_snapshot_for(cfg, get_relevance_index())
 
-            comment_map[c["comment_id"]] = comment
+
+def placements_hash(placements) -> Optional[str]:
+    return config_hash(placements)[:16] if placements is not None else None
+
+
+def update_relevance_index(week_json: list):
+    """Fold freshly saved posts into the index without a rebuild."""
+    if _RELEVANCE is None:
+        return
+    for entry in week_json:
+        post = entry["post"]
+        _RELEVANCE.add_documents(entry["subreddit"], [post["title"], post["body"], post["query"]])
 
 
 # ------------------------------------------------------------
@@ -246,7 +254,11 @@ def get_post_with_comments(post_id: int):
 
     post = db.query(Post).filter_by(id=post_id).first()
     if not post:
+        # Older threads live in the retention archive
+        archived = load_archived_thread(db, post_id)
         db.close()
+        if archived:
+            return archived
         raise HTTPException(status_code=404, detail="Post not found")
 
     comments = db.query(Comment).filter_by(post_id=post.id).all()
@@ -275,6 +287,89 @@ def get_post_with_comments(post_id: int):
     return result
 
 
+@app.get("/analytics/coverage")
+def get_coverage(
+    group_by: str = "subreddit",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    subreddit: Optional[str] = None,
+    persona: Optional[str] = None,
+):
+    """
+    Coverage from the rollup table, e.g. ?group_by=day,subreddit,persona,query
+    """
+    fields = [g.strip() for g in group_by.split(",") if g.strip()]
+
+    db = SessionLocal()
+    try:
+        return query_coverage(db, fields, start=start, end=end, subreddit=subreddit, persona=persona)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        db.close()
+
+
+# ------------------------------------------------------------
+# Request coalescing + idempotency for generation
+# ------------------------------------------------------------
+
+# Identical generation requests in flight share one run (and one DB save)
+GENERATION_FLIGHTS = SingleFlight()
+
+
+def request_hash(req: BaseModel) -> str:
+    payload = json.dumps(jsonable_encoder(req), sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def run_idempotent(endpoint: str, idempotency_key: Optional[str], req: BaseModel, flight_key, fn):
+    """
+    Return the stored response for a known Idempotency-Key; otherwise run
+    `fn` through the single-flight group and store its response under the key.
+    Records expire after a day (retention.py purges them); an expired key
+    counts as new.
+    """
+    req_hash = request_hash(req)
+
+    if idempotency_key:
+        db = SessionLocal()
+        try:
+            record = db.query(IdempotencyRecord).filter_by(key=idempotency_key).first()
+            if record is not None and record.created_at < idempotency_cutoff():
+                db.delete(record)
+                db.commit()
+                record = None
+        finally:
+            db.close()
+        if record is not None:
+            if record.endpoint != endpoint or record.request_hash != req_hash:
+                raise HTTPException(
+                    status_code=422,
+                    detail="Idempotency-Key was already used with a different request",
+                )
+            return json.loads(record.response)
+
+    response, _shared = GENERATION_FLIGHTS.do(flight_key, fn)
+
+    if idempotency_key:
+        db = SessionLocal()
+        try:
+            db.add(IdempotencyRecord(
+                key=idempotency_key,
+                endpoint=endpoint,
+                request_hash=req_hash,
+                response=json.dumps(jsonable_encoder(response), ensure_ascii=False),
+            ))
+            db.commit()
+        except IntegrityError:
+            # A concurrent retry with the same key stored it first
+            db.rollback()
+        finally:
+            db.close()
+
+    return response
+
+
 # ------------------------------------------------------------
 # Generation Endpoints
 # ------------------------------------------------------------
@@ -284,19 +379,56 @@ def health():
     return {"status": "ok", "engine": "running"}
 
 
+@app.get("/llm-stats")
+def llm_stats():
+    """Per-tier call counts, latency and estimated cost since startup."""
+    if _LLM is None:
+        return {}
+    return _LLM.report()
+
+
+@app.get("/validation-stats")
+def validation_stats():
+    """Per-rule counts of detected, locally repaired, re-asked and unresolved outputs."""
+    return VALIDATION_STATS.report()
+
+
 @app.post("/generate-week")
-def generate_week(req: WeekRequest):
+def generate_week(req: WeekRequest, idempotency_key: Optional[str] = Header(default=None)):
     cfg = dict(CONFIG)
 
     if req.override_posts_per_week:
         cfg["posts_per_week"] = req.override_posts_per_week
 
+    # An explicit seed or budget makes requests different; unset ones don't
+    flight_key = (
+        "generate-week",
+        config_hash(cfg),
+        req.start_date or date.today(),
+        req.max_comments_per_thread,
+        req.override_posts_per_week,
+        req.seed,
+        req.token_budget,
+    )
+    return run_idempotent(
+        "generate-week", idempotency_key, req, flight_key, lambda: _generate_week(req, cfg)
+    )
+
+
+def _generate_week(req: WeekRequest, cfg: dict):
+    seed = req.seed if req.seed is not None else new_seed()
+
     try:
+        placements = current_placements(cfg)
         result = generate_conversation_calendar(
             config=cfg,
-            llm=LLM,
+            llm=get_llm(),
             start_date=req.start_date,
             max_comments_per_thread=req.max_comments_per_thread,
+            seed=seed,
+            token_budget=req.token_budget,
+            engine=ENGINE,
+            placements=placements,
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating week: {e}")
@@ -310,23 +442,57 @@ def generate_week(req: WeekRequest):
     finally:
         db.close()
 
-    return {"status": "saved", "data": result}
+    update_relevance_index(result)
+
+    return {
+        "status": "saved",
+        "seed": seed,
+        "placements": placements_hash(placements),
+        "data": result,
+    }
 
 
 @app.post("/generate-weeks-and-save")
-def generate_weeks_and_save(req: MultiWeekRequest):
+def generate_weeks_and_save(
+    req: MultiWeekRequest,
+    idempotency_key: Optional[str] = Header(default=None),
+):
+    flight_key = (
+        "generate-weeks-and-save",
+        config_hash(CONFIG),
+        date.today(),
+        req.num_weeks,
+        req.output_dir,
+        req.max_comments_per_thread,
+        req.seed,
+    )
+    return run_idempotent(
+        "generate-weeks-and-save",
+        idempotency_key,
+        req,
+        flight_key,
+        lambda: _generate_weeks_and_save(req),
+    )
+
+
+def _generate_weeks_and_save(req: MultiWeekRequest):
     os.makedirs(req.output_dir, exist_ok=True)
 
     paths = []
     start = date.today()
+    seed = req.seed if req.seed is not None else new_seed()
+    placements = current_placements(CONFIG)
 
     for week in range(1, req.num_weeks + 1):
         try:
             calendar = generate_conversation_calendar(
                 config=CONFIG,
-                llm=LLM,
+                llm=get_llm(),
                 start_date=start,
                 max_comments_per_thread=req.max_comments_per_thread,
+                seed=seed + week - 1,
+                engine=ENGINE,
+                placements=placements,
             )
         except Exception as e:
             raise HTTPException(
@@ -346,5 +512,89 @@ def generate_weeks_and_save(req: MultiWeekRequest):
     return {
         "status": "success",
         "weeks_generated": req.num_weeks,
+        "seed": seed,
+        "placements": placements_hash(placements),
         "files": paths,
     }
+
+
+# ------------------------------------------------------------
+# Distributed generation (python worker.py)
+# ------------------------------------------------------------
+
+@app.post("/enqueue-week")
+def enqueue_week(req: WeekRequest, idempotency_key: Optional[str] = Header(default=None)):
+    """
+    Plan a week here and queue one task per thread for the workers.
+    Poll GET /batches/{batch_id} for progress and results.
+    """
+    cfg = dict(CONFIG)
+
+    if req.override_posts_per_week:
+        cfg["posts_per_week"] = req.override_posts_per_week
+
+    flight_key = (
+        "enqueue-week",
+        config_hash(cfg),
+        req.start_date or date.today(),
+        req.max_comments_per_thread,
+        req.override_posts_per_week,
+        req.seed,
+        req.token_budget,
+    )
+    return run_idempotent(
+        "enqueue-week", idempotency_key, req, flight_key, lambda: _enqueue_week(req, cfg)
+    )
+
+
+def _enqueue_week(req: WeekRequest, cfg: dict):
+    seed = req.seed if req.seed is not None else new_seed()
+    placements = current_placements(cfg)
+    assignments = plan_week(cfg, start_date=req.start_date, seed=seed, placements=placements)
+
+    # Workers can't share a running budget, so split it evenly up front,
+    # queueing only as many threads as the budget can cover
+    token_budget = req.token_budget or (cfg.get("thread_policy") or {}).get("weekly_token_budget")
+    if token_budget and assignments:
+        affordable = token_budget // estimate_thread_floor(cfg, assignments[0])
+        if affordable < 1:
+            raise HTTPException(
+                status_code=422, detail="token_budget is too small for a single thread"
+            )
+        assignments = assignments[:affordable]
+    params = {
+        "config": cfg,
+        "max_comments_per_thread": req.max_comments_per_thread,
+        "token_allowance": token_budget // max(len(assignments), 1) if token_budget else None,
+        "engine": ENGINE,
+    }
+
+    db = SessionLocal()
+    try:
+        batch_id = enqueue_assignments(db, assignments, params)
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"DB error: {e}")
+    finally:
+        db.close()
+
+    return {
+        "status": "queued",
+        "batch_id": batch_id,
+        "seed": seed,
+        "placements": placements_hash(placements),
+        "tasks": len(assignments),
+    }
+
+
+@app.get("/batches/{batch_id}")
+def get_batch(batch_id: str):
+    db = SessionLocal()
+    try:
+        status = batch_status(db, batch_id)
+    finally:
+        db.close()
+
+    if status is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return status
@@ -1,13 +1,24 @@
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from sqlalchemy import (
-    Column, Integer, String, Text, DateTime,
-    ForeignKey
+    Column, Integer, String, Text, DateTime, Date,
+    ForeignKey, UniqueConstraint, Index
 )
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
 
 
+def week_start(value: datetime) -> date:
+    """Monday of the week `value` falls in (the retention bucket)."""
+    day = value.date() if isinstance(value, datetime) else value
+    return day - timedelta(days=day.weekday())
+
+
+def _week_bucket_default(context) -> date:
+    created = context.get_current_parameters().get("created_at") or datetime.utcnow()
+    return week_start(created)
+
+
 # -------------------------
 # Users
 # -------------------------
@@ -56,6 +67,9 @@ class Post(Base):
     body = Column(Text)
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    # Week of created_at (Monday); retention archives whole buckets
+    week_bucket = Column(Date, default=_week_bucket_default, index=True)
+
     subreddit = relationship("Subreddit", back_populates="posts")
     author = relationship("User", back_populates="posts")
 
@@ -112,3 +126,102 @@ class Query(Base):
 
     # Relationships
     posts = relationship("Post", back_populates="query")
+
+
+# -------------------------
+# Coverage rollups (analytics)
+# -------------------------
+class CoverageRollup(Base):
+    """
+    One row per day x subreddit x persona x query, maintained incrementally
+    as weeks are saved. `day` is the post's created_at date.
+    """
+    __tablename__ = "coverage_rollups"
+
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)
+    subreddit_id = Column(Integer, ForeignKey("subreddits.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    query_id = Column(Integer, ForeignKey("queries.id"), nullable=True)
+
+    posts = Column(Integer, nullable=False, default=0)      # posts authored by the persona
+    comments = Column(Integer, nullable=False, default=0)   # comments authored by the persona
+    depth_sum = Column(Integer, nullable=False, default=0)  # sum of those comments' depths
+    max_depth = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    subreddit = relationship("Subreddit")
+    persona = relationship("User")
+    query = relationship("Query")
+
+    __table_args__ = (
+        UniqueConstraint("day", "subreddit_id", "user_id", "query_id", name="uq_coverage_key"),
+        Index("ix_coverage_day", "day"),
+    )
+
+
+# -------------------------
+# Archived posts (retention)
+# -------------------------
+class ArchivedPost(Base):
+    """
+    Index of threads moved out of posts/comments into compressed archive
+    files; lets /post/{id} read them back.
+    """
+    __tablename__ = "archived_posts"
+
+    post_id = Column(Integer, primary_key=True, autoincrement=False)  # original posts.id
+    week_bucket = Column(Date, nullable=False, index=True)
+    subreddit_id = Column(Integer, ForeignKey("subreddits.id"), nullable=True)
+    title = Column(String(500))
+    archive_file = Column(String(500), nullable=False)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+
+# -------------------------
+# Idempotency keys (generation endpoints)
+# -------------------------
+class IdempotencyRecord(Base):
+    """
+    Stored response for a generation request sent with an Idempotency-Key
+    header; retries with the same key get this back instead of regenerating.
+    Records expire after a day (see retention.purge_idempotency_records).
+    """
+    __tablename__ = "idempotency_records"
+
+    key = Column(String(255), primary_key=True)
+    endpoint = Column(String(100), nullable=False)
+    request_hash = Column(String(64), nullable=False)
+    response = Column(Text, nullable=False)  # JSON
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+# -------------------------
+# Generation task queue (distributed workers)
+# -------------------------
+class GenerationTask(Base):
+    """
+    One planned thread (keyword x subreddit x author) waiting for a worker.
+    A claimed task holds a lease; if the worker dies the lease expires and
+    another worker picks the task up again.
+    """
+    __tablename__ = "generation_tasks"
+
+    id = Column(Integer, primary_key=True)
+    batch_id = Column(String(64), nullable=False, index=True)
+    status = Column(String(20), nullable=False, default="pending")  # pending/running/done/failed
+    payload = Column(Text, nullable=False)   # JSON: assignment + generation params
+    result = Column(Text, nullable=True)     # JSON: calendar entry + saved post id
+    error = Column(Text, nullable=True)
+
+    worker_id = Column(String(255), nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_generation_tasks_claim", "status", "lease_expires_at"),
+    )
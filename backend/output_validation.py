@@ -0,0 +1,285 @@
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from thread_policy import estimate_tokens
+
+# ------------------------------------------------------------
+# Output validation + local repair
+#
+# Every LLM output is checked against the prompt rules. What can be
+# fixed locally is fixed in place; only irreparable outputs trigger
+# another LLM call, on the same tier that produced the output.
+# ------------------------------------------------------------
+
+# First-person disclosures only: the product is an AI tool, so "as an AI-powered
+# tool" or "as an AI enthusiast" is normal text, not a leak
+AI_DISCLOSURE_PATTERNS = (
+    r"\bas an? (?:ai|artificial intelligence)(?: language)? model\b",
+    r"\bas an ai\s*,\s*i\b",
+    r"\bas an? (?:large )?language model\b",
+    r"\bi(?:'m|’m| am) (?:just |only )?an? (?:ai|artificial intelligence|(?:large )?language model)\b(?![\w-])",
+)
+_AI_DISCLOSURE_RE = re.compile("|".join(AI_DISCLOSURE_PATTERNS), re.IGNORECASE)
+
+TITLE_MAX_CHARS = 300  # Reddit's own limit
+
+# Em-dashes anywhere; en-dashes only when used as a dash (not in "2–5")
+_DASH_RE = re.compile(r"\s*,?\s*—\s*|\s+–\s+")
+# A dash opening or closing a line has nothing to join; drop it
+_EDGE_DASH_RE = re.compile(r"^[ \t]*(?:—|–(?=\s))[ \t]*|[ \t]*(?:—|(?<=\s)–)[ \t]*$", re.MULTILINE)
+_BOLD_RE = re.compile(r"\*\*(?=\S)(.+?)(?<=\S)\*\*")
+# __bold__ must contain a space so identifiers like __init__ survive
+_UNDERSCORE_BOLD_RE = re.compile(r"(?<!\w)__(?=\S)([^_\n]*\s[^_\n]*)(?<=\S)__(?!\w)")
+_ITALIC_RE = re.compile(r"(?<![\w*])\*(?!\s)(.+?)(?<!\s)\*(?![\w*])")
+_CODE_RE = re.compile(r"`([^`]*)`")
+_LINK_RE = re.compile(r"\[([^\]]+)\]\([^)]+\)")
+_HEADING_RE = re.compile(r"^\s{0,3}#{1,6}\s+", re.MULTILINE)
+# Only symbol bullets; "2. export" reads the same as plain text
+_BULLET_RE = re.compile(r"^[ \t]*[-*+][ \t]+(?=\S)", re.MULTILINE)
+_QUOTE_LINE_RE = re.compile(r"^\s*>.*$\n?", re.MULTILINE)
+_WRAP_QUOTES = (('"', '"'), ("“", "”"), ("'", "'"))
+
+
+class ValidationStats:
+    """
+    Process-wide counters per rule: how often it was hit, repaired locally,
+    re-asked from the LLM, or left unresolved.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def bump(self, rule: str, outcome: str) -> None:
+        with self._lock:
+            counts = self._counts.setdefault(
+                rule, {"detected": 0, "repaired": 0, "reasked": 0, "unresolved": 0}
+            )
+            counts[outcome] += 1
+
+    def report(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {rule: dict(c) for rule, c in self._counts.items()}
+
+
+STATS = ValidationStats()
+
+
+@dataclass
+class ValidationResult:
+    text: str
+    repaired: List[str] = field(default_factory=list)
+    violations: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.violations
+
+
+# ------------------------------------------------------------
+# Local repairs
+# ------------------------------------------------------------
+
+def replace_dashes(text: str) -> str:
+    text = _EDGE_DASH_RE.sub("", text)
+    return _DASH_RE.sub(", ", text).strip()
+
+
+def strip_markdown(text: str) -> str:
+    text = _LINK_RE.sub(r"\1", text)
+    text = _BOLD_RE.sub(r"\1", text)
+    text = _UNDERSCORE_BOLD_RE.sub(r"\1", text)
+    text = _ITALIC_RE.sub(r"\1", text)
+    text = _CODE_RE.sub(r"\1", text)
+    text = _HEADING_RE.sub("", text)
+    text = _BULLET_RE.sub("", text)
+    return text.strip()
+
+
+def strip_wrapping_quotes(text: str) -> str:
+    stripped = text.strip()
+    for open_q, close_q in _WRAP_QUOTES:
+        if len(stripped) > 1 and stripped.startswith(open_q) and stripped.endswith(close_q):
+            inner = stripped[1:-1]
+            if open_q not in inner and close_q not in inner:
+                return inner.strip()
+    return stripped
+
+
+def _metadata_prefix(username: Optional[str]) -> "re.Pattern[str]":
+    names = ["comment", "reply", "response"]
+    if username:
+        names.append(re.escape(username))
+    return re.compile(rf"^\s*(?:{'|'.join(names)})\s*(?:\([^)]*\))?\s*:\s*", re.IGNORECASE)
+
+
+def _has_ai_phrase(text: str) -> bool:
+    return bool(_AI_DISCLOSURE_RE.search(text))
+
+
+def _repeats_previous(text: str, previous: Sequence[str]) -> bool:
+    norm = " ".join(text.lower().split())
+    for prev in previous:
+        prev_norm = " ".join(prev.lower().split())
+        if prev_norm and (norm == prev_norm or (len(prev_norm) > 40 and prev_norm in norm)):
+            return True
+    return False
+
+
+def _apply(
+    result: ValidationResult,
+    rule: str,
+    detect: Callable[[str], bool],
+    repair: Callable[[str], str],
+    stats: ValidationStats,
+) -> None:
+    if detect(result.text):
+        stats.bump(rule, "detected")
+        result.text = repair(result.text)
+        result.repaired.append(rule)
+        stats.bump(rule, "repaired")
+
+
+def _flag(result: ValidationResult, rule: str, stats: ValidationStats) -> None:
+    stats.bump(rule, "detected")
+    result.violations.append(rule)
+
+
+# ------------------------------------------------------------
+# Validators
+# ------------------------------------------------------------
+
+def validate_comment(
+    text: str,
+    previous: Sequence[str] = (),
+    username: Optional[str] = None,
+    stats: ValidationStats = STATS,
+) -> ValidationResult:
+    """
+    Check a generated comment against the comment prompt rules.
+    """
+    result = ValidationResult(text=text.strip())
+
+    _apply(result, "quoted_comment", lambda t: bool(_QUOTE_LINE_RE.search(t)),
+           lambda t: _QUOTE_LINE_RE.sub("", t).strip(), stats)
+    prefix = _metadata_prefix(username)
+    _apply(result, "metadata_prefix", lambda t: bool(prefix.match(t)),
+           lambda t: prefix.sub("", t, count=1), stats)
+    _apply(result, "wrapping_quotes", lambda t: strip_wrapping_quotes(t) != t.strip(),
+           strip_wrapping_quotes, stats)
+    _apply(result, "markdown", lambda t: strip_markdown(t) != t.strip(), strip_markdown, stats)
+    _apply(result, "em_dash", lambda t: replace_dashes(t) != t.strip(), replace_dashes, stats)
+
+    if not result.text.strip():
+        _flag(result, "empty", stats)
+    if _has_ai_phrase(result.text):
+        _flag(result, "ai_disclosure", stats)
+    if _repeats_previous(result.text, previous):
+        _flag(result, "repeats_previous", stats)
+
+    return result
+
+
+def split_post_response(text: str) -> Optional[Tuple[str, str]]:
+    upper = text.upper()
+    if "TITLE:" in upper and "BODY:" in upper:
+        t = upper.index("TITLE:")
+        b = upper.index("BODY:")
+        if t < b:
+            return text[t + len("TITLE:"):b].strip(), text[b + len("BODY:"):].strip()
+    return None
+
+
+def validate_post(text: str, stats: ValidationStats = STATS) -> Tuple[str, str, ValidationResult]:
+    """
+    Check a generated post. Returns (title, body, result); `result.text` is the body.
+    """
+    parts = split_post_response(text)
+    if parts is None:
+        result = ValidationResult(text=text.strip())
+        _flag(result, "post_format", stats)
+        return "", result.text, result
+
+    title, body = parts
+    title_result = ValidationResult(text=title)
+    _apply(title_result, "markdown", lambda t: strip_markdown(t) != t.strip(), strip_markdown, stats)
+    _apply(title_result, "wrapping_quotes", lambda t: strip_wrapping_quotes(t) != t.strip(),
+           strip_wrapping_quotes, stats)
+    _apply(title_result, "em_dash", lambda t: replace_dashes(t) != t.strip(), replace_dashes, stats)
+    _apply(title_result, "title_length", lambda t: len(t) > TITLE_MAX_CHARS,
+           lambda t: t[:TITLE_MAX_CHARS].rsplit(" ", 1)[0], stats)
+
+    result = ValidationResult(text=body, repaired=title_result.repaired)
+    _apply(result, "em_dash", lambda t: replace_dashes(t) != t.strip(), replace_dashes, stats)
+
+    if not title_result.text or not result.text:
+        _flag(result, "empty", stats)
+    if _has_ai_phrase(title_result.text) or _has_ai_phrase(result.text):
+        _flag(result, "ai_disclosure", stats)
+
+    return title_result.text, result.text, result
+
+
+# ------------------------------------------------------------
+# Re-ask only when local repair is not enough
+# ------------------------------------------------------------
+
+RULE_HINTS = {
+    "post_format": "Use exactly the format `TITLE: <title>` then `BODY:` and the body.",
+    "empty": "The answer was empty.",
+    "ai_disclosure": "Never mention being an AI or a language model.",
+    "repeats_previous": "Do not repeat or rephrase an earlier comment; say something new.",
+}
+
+
+def build_repair_prompt(user_prompt: str, previous_output: str, violations: List[str]) -> str:
+    problems = "\n".join(f"- {RULE_HINTS.get(v, v)}" for v in violations)
+    return f"""{user_prompt}
+
+Your previous answer was:
+{previous_output}
+
+It broke these rules:
+{problems}
+
+Rewrite it so it follows every rule. Return only the corrected answer.
+"""
+
+
+def complete_validated(
+    llm: Any,
+    system_prompt: str,
+    user_prompt: str,
+    node: str,
+    validate: Callable[[str], Any],
+    max_repairs: int = 1,
+    stats: ValidationStats = STATS,
+) -> Tuple[Any, int]:
+    """
+    Call the LLM, validate, and re-ask (on the same `node`, so a post is
+    rewritten by the post tier) only for irreparable outputs. `validate` returns an object whose last element (or
+    itself) is a ValidationResult. Returns (validated output, tokens spent).
+    """
+    raw = llm.complete(system_prompt, user_prompt, node=node)
+    tokens = estimate_tokens(system_prompt, user_prompt, raw)
+    checked = validate(raw)
+    result = checked[-1] if isinstance(checked, tuple) else checked
+
+    for _ in range(max_repairs):
+        if result.ok:
+            break
+        for rule in result.violations:
+            stats.bump(rule, "reasked")
+
+        repair_prompt = build_repair_prompt(user_prompt, raw, result.violations)
+        raw = llm.complete(system_prompt, repair_prompt, node=node)
+        tokens += estimate_tokens(system_prompt, repair_prompt, raw)
+        checked = validate(raw)
+        result = checked[-1] if isinstance(checked, tuple) else checked
+
+    for rule in result.violations:
+        stats.bump(rule, "unresolved")
+
+    return checked, tokens
@@ -0,0 +1,139 @@
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from analytics import apply_coverage_deltas, thread_coverage_deltas
+from models import Comment, Post, Query, Subreddit, User
+
+# ------------------------------------------------------------
+# Saving generated threads
+#
+# Shared by the API (main.py) and the queue workers (worker.py), so
+# neither needs the other's config or process state.
+# ------------------------------------------------------------
+
+
+def get_or_create_user(db: Session, username: str):
+    user = db.query(User).filter_by(username=username).first()
+    if not user:
+        try:
+            user = User(username=username)
+            db.add(user)
+            db.commit()
+            db.refresh(user)
+        except IntegrityError:
+            # Another worker created it first; use theirs
+            db.rollback()
+            user = db.query(User).filter_by(username=username).one()
+    return user
+
+
+def get_or_create_subreddit(db: Session, name: str):
+    clean = name.replace("r/", "")
+    subreddit = db.query(Subreddit).filter_by(name=clean).first()
+    if not subreddit:
+        try:
+            subreddit = Subreddit(name=clean, title=f"r/{clean}")
+            db.add(subreddit)
+            db.commit()
+            db.refresh(subreddit)
+        except IntegrityError:
+            db.rollback()
+            subreddit = db.query(Subreddit).filter_by(name=clean).one()
+    return subreddit
+
+
+def get_or_create_query(db: Session, query_text: str):
+    """Create or fetch query row."""
+    q = db.query(Query).filter_by(text=query_text).first()
+    if not q:
+        try:
+            q = Query(text=query_text)
+            db.add(q)
+            db.commit()
+            db.refresh(q)
+        except IntegrityError:
+            db.rollback()
+            q = db.query(Query).filter_by(text=query_text).one()
+    return q
+
+
+def insert_thread(db: Session, entry: Dict[str, Any]) -> Tuple[Post, List[Tuple[int, int]]]:
+    """
+    Add one calendar entry's post and threaded comments to the session
+    WITHOUT committing, so the caller decides what commits with them.
+    Subreddit/user/query rows are resolved (and committed) first; they are
+    shared and safe to create more than once.
+
+    Returns (post, [(comment user_id, depth)]) for the coverage rollups.
+    """
+    post_data = entry["post"]
+    comments_data = entry["comments"]
+
+    subreddit = get_or_create_subreddit(db, entry["subreddit"])
+    author = get_or_create_user(db, post_data["author"])
+    query_row = get_or_create_query(db, post_data["query"])
+    commenters = {c["author"]: get_or_create_user(db, c["author"]) for c in comments_data}
+
+    post = Post(
+        subreddit_id=subreddit.id,
+        user_id=author.id,
+        title=post_data["title"],
+        body=post_data["body"],
+        query_id=query_row.id,
+        query_text=post_data["query"],
+    )
+    db.add(post)
+    db.flush()
+
+    comment_map = {}
+    depth_map = {}
+    coverage = []
+
+    for c in comments_data:
+        comment_author = commenters[c["author"]]
+        parent = comment_map.get(c["parent_comment_id"])
+
+        comment = Comment(
+            post_id=post.id,
+            user_id=comment_author.id,
+            parent_comment_id=parent.id if parent is not None else None,
+            text=c["text"],
+        )
+        db.add(comment)
+        db.flush()
+
+        comment_map[c["comment_id"]] = comment
+
+        depth = depth_map.get(c["parent_comment_id"], 0) + 1
+        depth_map[c["comment_id"]] = depth
+        coverage.append((comment_author.id, depth))
+
+    return post, coverage
+
+
+def save_generated_week_to_db(db: Session, week_json: list):
+    """
+    Inserts generated JSON into DB:
+    - queries
+    - subreddits
+    - posts
+    - users
+    - threaded comments
+    - coverage rollups (analytics)
+
+    Each thread commits as a unit, so a failure never leaves half a thread.
+    Returns the new post ids, in calendar order.
+    """
+
+    post_ids = []
+    for entry in week_json:
+        post, coverage = insert_thread(db, entry)
+        db.commit()
+        post_ids.append(post.id)
+
+        # Rollups
+        apply_coverage_deltas(db, thread_coverage_deltas(post, coverage))
+
+    return post_ids
@@ -1,22 +1,35 @@
 import os
 import json
 import random
+import threading
+import time
+from functools import lru_cache
 from dataclasses import dataclass, field, asdict, is_dataclass
 from datetime import date, timedelta
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 
-from langgraph.graph import StateGraph, END
-from langchain_groq import ChatGroq
-from langchain_openai import ChatOpenAI
-
-from langchain_core.messages import SystemMessage, HumanMessage
 from dotenv import load_dotenv
 
+from thread_policy import (
+    SpeakerPolicy,
+    TerminationPolicy,
+    TokenBudget,
+    estimate_tokens,
+    speaker_policy_from_config,
+    termination_policy_from_config,
+)
+from output_validation import complete_validated, validate_comment, validate_post
+from run_manifest import RunManifest, RecordingLLM, ReplayLLM, new_manifest, verify_manifest
+
 # ------------------------------------------------------------
 # LLM Wrapper using LangChain's ChatGroq
+#
+# langgraph / langchain_* are heavy to import, so they are only
+# imported when a client or the graph is first needed.
 # ------------------------------------------------------------
 
-
+# Same value as langgraph.graph.END, without importing langgraph
+END = "__end__"
 
 load_dotenv()
 
@@ -27,10 +40,11 @@ class LargeLangModel:
 
     def __init__(
         self,
-        groq_model: str = "openai/gpt-oss-120b",
-        openai_model: str = "gpt-4.1-mini",
+        groq_model: Optional[str] = "openai/gpt-oss-120b",
+        openai_model: Optional[str] = "gpt-4.1-mini",
         groq_api_key: Optional[str] = None,
         openai_api_key: Optional[str] = None,
+        timeout: Optional[float] = None,
     ):
 
         # API KEYS
@@ -40,22 +54,49 @@ class LargeLangModel:
         self.groq_model = groq_model
         self.openai_model = openai_model
 
-        # Initialize clients
-        if self.groq_api_key:
-            self.groq_llm = ChatGroq(model=self.groq_model, groq_api_key=self.groq_api_key)
-        else:
-            self.groq_llm = None
+        self.timeout = timeout
 
-        if self.openai_api_key:
-            self.openai_llm = ChatOpenAI(model=self.openai_model, api_key=self.openai_api_key)
-        else:
-            self.openai_llm = None
+        # Clients are built on the first completion, not at construction
+        self.groq_llm = None
+        self.openai_llm = None
+        self._clients_ready = False
+        self._clients_lock = threading.Lock()
+
+    def _init_clients(self) -> None:
+        """
+        Import provider SDKs and build clients (a tier may leave one out by passing None).
+        """
+        with self._clients_lock:
+            if self._clients_ready:
+                return
+
+            if self.groq_api_key and self.groq_model:
+                from langchain_groq import ChatGroq
+
+                self.groq_llm = ChatGroq(
+                    model=self.groq_model, groq_api_key=self.groq_api_key, timeout=self.timeout
+                )
+
+            if self.openai_api_key and self.openai_model:
+                from langchain_openai import ChatOpenAI
+
+                self.openai_llm = ChatOpenAI(
+                    model=self.openai_model, api_key=self.openai_api_key, timeout=self.timeout
+                )
+
+            self._clients_ready = True
 
     # ------------------------------------------------------------------
-    def complete(self, system_prompt: str, user_prompt: str) -> str:
+    def complete(self, system_prompt: str, user_prompt: str, node: Optional[str] = None) -> str:
         """
         Try Groq first. If it fails or doesn't exist, fallback to OpenAI.
+        `node` is accepted for interface parity with TieredLLM and ignored.
         """
+        from langchain_core.messages import SystemMessage, HumanMessage
+
+        if not self._clients_ready:
+            self._init_clients()
+
         messages = [
             SystemMessage(content=system_prompt),
             HumanMessage(content=user_prompt),
@@ -84,6 +125,158 @@ class LargeLangModel:
         raise RuntimeError("Both Groq and OpenAI failed or are not configured.")
 
 
+# ------------------------------------------------------------
+# Model tiering: route node types to differently sized models
+# ------------------------------------------------------------
+
+@dataclass
+class ModelTier:
+    name: str
+    groq_model: Optional[str] = None
+    openai_model: Optional[str] = None
+    timeout: float = 60.0
+    max_concurrency: int = 8
+    # USD per 1k tokens (estimate); leave None to skip cost reporting
+    cost_per_1k_tokens: Optional[float] = None
+
+
+DEFAULT_MODEL_TIERS: Dict[str, Dict[str, Any]] = {
+    "strong": {
+        "groq_model": "openai/gpt-oss-120b",
+        "openai_model": "gpt-4.1-mini",
+        "timeout": 60.0,
+        "max_concurrency": 4,
+    },
+    "fast": {
+        "groq_model": "llama-3.1-8b-instant",
+        "openai_model": "gpt-4.1-nano",
+        "timeout": 20.0,
+        "max_concurrency": 16,
+    },
+}
+
+DEFAULT_MODEL_ROUTES: Dict[str, str] = {
+    "post": "strong",
+    "comment": "fast",
+    "reply": "fast",
+    # Kept configurable but currently unused: validation is rule-based and
+    # re-asks go to the original node's tier
+    "validation": "fast",
+}
+
+
+@dataclass
+class TierStats:
+    calls: int = 0
+    failures: int = 0
+    tokens: int = 0
+    total_latency: float = 0.0
+    max_latency: float = 0.0
+
+
+class TieredLLM:
+    """
+    Routes each completion to a model tier based on the node that asked for it
+    (post, comment, reply, validation). Each tier has its own providers,
+    timeout and concurrency limit, and keeps its own latency/cost counters.
+    """
+
+    def __init__(
+        self,
+        tiers: List[ModelTier],
+        routes: Optional[Dict[str, str]] = None,
+        default_tier: str = "strong",
+    ):
+        self.tiers = {t.name: t for t in tiers}
+        self.routes = dict(routes or DEFAULT_MODEL_ROUTES)
+        self.default_tier = default_tier
+
+        for node, tier in self.routes.items():
+            if tier not in self.tiers:
+                raise ValueError(f"Route '{node}' points to unknown tier '{tier}'")
+        if default_tier not in self.tiers:
+            raise ValueError(f"Unknown default tier '{default_tier}'")
+
+        self._clients = {
+            t.name: LargeLangModel(
+                groq_model=t.groq_model,
+                openai_model=t.openai_model,
+                timeout=t.timeout,
+            )
+            for t in tiers
+        }
+        self._slots = {t.name: threading.BoundedSemaphore(t.max_concurrency) for t in tiers}
+        self._stats = {t.name: TierStats() for t in tiers}
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    def tier_for(self, node: Optional[str]) -> str:
+        return self.routes.get(node or "", self.default_tier)
+
+    def complete(self, system_prompt: str, user_prompt: str, node: Optional[str] = None) -> str:
+        tier = self.tier_for(node)
+        started = time.perf_counter()
+        failed = False
+        text = ""
+
+        try:
+            with self._slots[tier]:
+                text = self._clients[tier].complete(system_prompt, user_prompt)
+            return text
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                stats = self._stats[tier]
+                stats.calls += 1
+                stats.failures += int(failed)
+                stats.tokens += estimate_tokens(system_prompt, user_prompt, text)
+                stats.total_latency += elapsed
+                stats.max_latency = max(stats.max_latency, elapsed)
+
+    def report(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Per-tier calls, latency and (estimated) tokens/cost since startup.
+        """
+        out: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for name, stats in self._stats.items():
+                tier = self.tiers[name]
+                cost = None
+                if tier.cost_per_1k_tokens is not None:
+                    cost = round(stats.tokens / 1000 * tier.cost_per_1k_tokens, 6)
+                out[name] = {
+                    "groq_model": tier.groq_model,
+                    "openai_model": tier.openai_model,
+                    "nodes": sorted(n for n, t in self.routes.items() if t == name),
+                    "calls": stats.calls,
+                    "failures": stats.failures,
+                    "avg_latency_s": round(stats.total_latency / stats.calls, 4) if stats.calls else 0.0,
+                    "max_latency_s": round(stats.max_latency, 4),
+                    "est_tokens": stats.tokens,
+                    "est_cost_usd": cost,
+                }
+        return out
+
+
+def tiered_llm_from_config(config: Dict[str, Any]) -> TieredLLM:
+    """
+    Build a TieredLLM from the optional `model_tiers` / `model_routes` config blocks;
+    anything missing falls back to DEFAULT_MODEL_TIERS / DEFAULT_MODEL_ROUTES.
+    """
+    tier_specs = {name: dict(spec) for name, spec in DEFAULT_MODEL_TIERS.items()}
+    for name, spec in (config.get("model_tiers") or {}).items():
+        tier_specs.setdefault(name, {}).update(spec)
+
+    routes = dict(DEFAULT_MODEL_ROUTES)
+    routes.update(config.get("model_routes") or {})
+
+    tiers = [ModelTier(name=name, **spec) for name, spec in tier_specs.items()]
+    return TieredLLM(tiers, routes=routes, default_tier=routes.get("post", "strong"))
+
+
 # ------------------------------------------------------------
 # Data model
 # ------------------------------------------------------------
@@ -118,10 +311,10 @@ class Comment:
     text: str
 
 
-@dataclass
+@dataclass(slots=True)
 class ConversationState:
     """
-    LangGraph state for one Reddit-style thread.
+    State for one Reddit-style thread, shared by the LangGraph and native runners.
     """
     company_info: CompanyInfo
     personas: List[Persona]
@@ -135,6 +328,14 @@ class ConversationState:
     comments: List[Comment] = field(default_factory=list)
     turn: int = 0
 
+    # Per-run RNG shared by every node of the thread (never the global `random`)
+    rng: Optional[random.Random] = None
+
+    # Adaptive length: sampled target and this thread's share of the token budget
+    target_length: Optional[int] = None
+    token_allowance: Optional[int] = None
+    tokens_used: int = 0
+
 
 # ------------------------------------------------------------
 # Utility: safe convert dataclass ↦ dict
@@ -153,6 +354,16 @@ def to_dict(obj: Any) -> Any:
     return obj
 
 
+def record_to_dict(obj: Any) -> Optional[Dict[str, Any]]:
+    """
+    Shallow dict for Post/Comment: their fields are all scalars, so there
+    is nothing for asdict's recursive deep copy to do.
+    """
+    if obj is None or isinstance(obj, dict):
+        return obj
+    return dict(vars(obj))
+
+
 # ------------------------------------------------------------
 # Prompt builders
 # ------------------------------------------------------------
@@ -269,8 +480,13 @@ def post_node(state: ConversationState, llm: LargeLangModel) -> ConversationStat
     system_prompt = "You are good at writing natural, non-salesy Reddit posts."
     user_prompt = build_post_prompt(state)
 
-    raw = llm.complete(system_prompt, user_prompt)
-    title, body = parse_post_response(raw)
+    (title, body, result), tokens = complete_validated(
+        llm, system_prompt, user_prompt, "post", validate_post
+    )
+    state.tokens_used += tokens
+
+    if "post_format" in result.violations:
+        title, body = parse_post_response(result.text)
 
     state.post = Post(
         post_id=state.post_id,
@@ -283,17 +499,29 @@ def post_node(state: ConversationState, llm: LargeLangModel) -> ConversationStat
     return state
 
 
-def comment_node(state: ConversationState, llm: LargeLangModel) -> ConversationState:
+def comment_node(
+    state: ConversationState,
+    llm: LargeLangModel,
+    policy: SpeakerPolicy,
+) -> ConversationState:
     """
     Add one new comment to the thread.
+    Speaker and reply target are chosen by the policy before calling the LLM.
     """
-    persona = random.choice(state.personas)
-
-    possible_parents: List[Optional[Comment]] = [None] + state.comments
-    parent = random.choice(possible_parents)
+    persona, parent = policy.select(state, state.rng)
 
     system_prompt, user_prompt = build_comment_prompt(state, persona, parent)
-    text = llm.complete(system_prompt, user_prompt)
+    previous = [c.text for c in state.comments]
+
+    result, tokens = complete_validated(
+        llm,
+        system_prompt,
+        user_prompt,
+        "reply" if parent else "comment",
+        lambda raw: validate_comment(raw, previous, persona.username),
+    )
+    state.tokens_used += tokens
+    text = result.text
 
     cid = f"C{len(state.comments) + 1}"
     parent_id = parent.comment_id if parent else None
@@ -311,11 +539,11 @@ def comment_node(state: ConversationState, llm: LargeLangModel) -> ConversationS
     return state
 
 
-def router_node(state: ConversationState) -> str:
+def router_node(state: ConversationState, termination: TerminationPolicy) -> str:
     """
     Decide whether to continue generating comments or stop.
     """
-    if state.turn >= state.max_comments:
+    if termination.should_stop(state):
         return END
     return "comment"
 
@@ -324,97 +552,400 @@ def router_node(state: ConversationState) -> str:
 # Build conversation graph
 # ------------------------------------------------------------
 
-def build_conversation_graph(llm: LargeLangModel):
+def build_conversation_graph():
     """
     Wire up LangGraph for a single Reddit-style thread.
+
+    The LLM and policies are not baked in; they are passed per invocation via
+    `config["configurable"]`, so one compiled graph serves every call.
     """
+    from langgraph.graph import StateGraph
 
     graph = StateGraph(ConversationState)
 
-    graph.add_node("post", lambda s: post_node(s, llm))
-    graph.add_node("comment", lambda s: comment_node(s, llm))
+    graph.add_node("post", lambda s, config: post_node(s, config["configurable"]["llm"]))
+    graph.add_node(
+        "comment",
+        lambda s, config: comment_node(
+            s, config["configurable"]["llm"], config["configurable"]["policy"]
+        ),
+    )
 
     graph.set_entry_point("post")
     graph.add_edge("post", "comment")
 
     graph.add_conditional_edges(
         "comment",
-        router_node,
+        lambda s, config: router_node(s, config["configurable"]["termination"]),
         {"comment": "comment", END: END},
     )
 
     return graph.compile()
 
 
+@lru_cache(maxsize=1)
+def get_conversation_graph():
+    """
+    Compile the graph once per process.
+    """
+    return build_conversation_graph()
+
+
+# ------------------------------------------------------------
+# Thread runners
+# ------------------------------------------------------------
+
+ENGINES = ("langgraph", "native")
+
+
+def run_thread_native(
+    state: ConversationState,
+    llm: LargeLangModel,
+    policy: SpeakerPolicy,
+    termination: TerminationPolicy,
+) -> ConversationState:
+    """
+    Same post -> comment* loop as the graph, mutating one state object in place.
+    """
+    post_node(state, llm)
+    while True:
+        comment_node(state, llm, policy)
+        if router_node(state, termination) == END:
+            return state
+
+
+def run_thread(
+    state: ConversationState,
+    llm: LargeLangModel,
+    policy: SpeakerPolicy,
+    termination: TerminationPolicy,
+    engine: str = "langgraph",
+) -> Tuple[Optional[Post], List[Comment], int]:
+    """
+    Run one thread on the chosen engine. Returns (post, comments, tokens_used).
+    """
+    if engine == "native":
+        result = run_thread_native(state, llm, policy, termination)
+        return result.post, result.comments, result.tokens_used
+
+    if engine != "langgraph":
+        raise ValueError(f"Unknown engine '{engine}', expected one of {ENGINES}")
+
+    # LangGraph may return a dataclass or a dict depending on wiring/version
+    result_state: Union[ConversationState, Dict[str, Any]] = get_conversation_graph().invoke(
+        state,
+        config={"configurable": {"llm": llm, "policy": policy, "termination": termination}},
+    )
+
+    if isinstance(result_state, dict):
+        # dict-style state
+        return (
+            result_state.get("post"),
+            result_state.get("comments", []),
+            result_state.get("tokens_used", 0),
+        )
+    # dataclass-style state
+    return result_state.post, result_state.comments, result_state.tokens_used
+
+
 # ------------------------------------------------------------
 # Calendar generation
 # ------------------------------------------------------------
 
-def generate_conversation_calendar(
+def new_seed() -> int:
+    return random.SystemRandom().randrange(2**32)
+
+
+def placement_snapshot_for(
     config: Dict[str, Any],
-    llm: Optional[LargeLangModel] = None,
-    start_date: Optional[date] = None,
-    max_comments_per_thread: int = 6,
-) -> List[Dict[str, Any]]:
+    relevance: Optional[Any] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Frozen keyword -> subreddit probabilities (relevance.placement_snapshot),
+    or None when `config["placement"]["mode"]` is "uniform".
+    """
+    if (config.get("placement") or {}).get("mode", "relevance") != "relevance":
+        return None
 
-    if llm is None:
-        llm = LargeLangModel()
+    from relevance import placement_snapshot
+
+    return placement_snapshot(config, relevance)
 
+
+def plan_week(
+    config: Dict[str, Any],
+    start_date: Optional[date] = None,
+    seed: Optional[int] = None,
+    relevance: Optional[Any] = None,
+    placements: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Pick the week's threads without running any of them: one
+    {post_id, date, query, subreddit, author, seed} assignment per post.
+    Each assignment carries its own seed, so threads can run in any order
+    (or on different workers) and still reproduce the same calendar.
+
+    Subreddits are sampled per keyword from `placements` (a snapshot from
+    placement_snapshot_for; built from `relevance` or the config if not
+    given) unless `config["placement"]["mode"]` is "uniform". The live index
+    grows with every saved post, so a seed only reproduces a plan together
+    with the same snapshot (or in uniform mode).
+    """
     if start_date is None:
         start_date = date.today()
 
-    personas = [Persona(**p) for p in config["personas"]]
-    company_info = CompanyInfo(description=config["company_info"]["description"])
+    if seed is None:
+        seed = new_seed()
+    rng = random.Random(seed)
+
+    personas = [p["username"] for p in config["personas"]]
     keywords = [k["keyword"] for k in config["keywords"]]
     subreddits = config["subreddits"]
     posts_per_week = config["posts_per_week"]
 
-    random.shuffle(keywords)
+    rng.shuffle(keywords)
     queries = keywords[:posts_per_week]
 
-    graph = build_conversation_graph(llm)
+    if placements is None:
+        placements = placement_snapshot_for(config, relevance)
+    if placements is not None:
+        subreddits = placements["subreddits"]
 
-    schedule: List[Dict[str, Any]] = []
+    assignments: List[Dict[str, Any]] = []
 
     for idx, query in enumerate(queries, start=1):
-        post_id = f"P{idx}"
-        author = random.choice(personas).username
-        subreddit = random.choice(subreddits)
-
-        init_state = ConversationState(
-            company_info=company_info,
-            personas=personas,
-            subreddit=subreddit,
-            query=query,
-            seed_username=author,
-            post_id=post_id,
-            max_comments=max_comments_per_thread,
-        )
-
-        # LangGraph may return a dataclass or a dict depending on wiring/version
-        result_state: Union[ConversationState, Dict[str, Any]] = graph.invoke(init_state)
-
-        if isinstance(result_state, dict):
-            # dict-style state
-            post_obj = result_state.get("post")
-            comments_obj = result_state.get("comments", [])
+        author = rng.choice(personas)
+        weights = placements["weights"].get(query) if placements is not None else None
+        if weights is None:
+            subreddit = rng.choice(subreddits)
         else:
-            # dataclass-style state
-            post_obj = result_state.post
-            comments_obj = result_state.comments
+            subreddit = rng.choices(subreddits, weights=weights, k=1)[0]
 
-        schedule.append(
+        assignments.append(
             {
+                "post_id": f"P{idx}",
                 "date": str(start_date + timedelta(days=idx - 1)),
+                "query": query,
                 "subreddit": subreddit,
-                "post": to_dict(post_obj),
-                "comments": to_dict(comments_obj),
+                "author": author,
+                "seed": rng.randrange(2**32),
             }
         )
 
+    return assignments
+
+
+def generate_thread(
+    config: Dict[str, Any],
+    assignment: Dict[str, Any],
+    llm: LargeLangModel,
+    max_comments_per_thread: int = 6,
+    policy: Optional[SpeakerPolicy] = None,
+    termination: Optional[TerminationPolicy] = None,
+    token_allowance: Optional[int] = None,
+    engine: str = "langgraph",
+) -> Tuple[Dict[str, Any], int]:
+    """
+    Run one planned thread. Returns (calendar entry, tokens_used).
+    """
+    if policy is None:
+        policy = speaker_policy_from_config(config)
+
+    if termination is None:
+        termination = termination_policy_from_config(config)
+
+    rng = random.Random(assignment["seed"])
+    subreddit = assignment["subreddit"]
+
+    init_state = ConversationState(
+        company_info=CompanyInfo(description=config["company_info"]["description"]),
+        personas=[Persona(**p) for p in config["personas"]],
+        subreddit=subreddit,
+        query=assignment["query"],
+        seed_username=assignment["author"],
+        post_id=assignment["post_id"],
+        max_comments=max_comments_per_thread,
+        rng=rng,
+        target_length=termination.sample_length(subreddit, max_comments_per_thread, rng),
+        token_allowance=token_allowance,
+    )
+
+    post_obj, comments_obj, tokens_used = run_thread(
+        init_state, llm, policy, termination, engine=engine
+    )
+
+    entry = {
+        "date": assignment["date"],
+        "subreddit": subreddit,
+        "post": record_to_dict(post_obj),
+        "comments": [record_to_dict(c) for c in comments_obj],
+    }
+    return entry, tokens_used
+
+
+def estimate_thread_floor(config: Dict[str, Any], assignment: Dict[str, Any]) -> int:
+    """
+    Input-only estimate of the cheapest possible thread (a post plus one
+    comment), used to decide whether the week's budget can still afford one.
+    """
+    state = ConversationState(
+        company_info=CompanyInfo(description=config["company_info"]["description"]),
+        personas=[Persona(**p) for p in config["personas"]],
+        subreddit=assignment["subreddit"],
+        query=assignment["query"],
+        seed_username=assignment["author"],
+        post_id=assignment["post_id"],
+    )
+    commenter = next(
+        (p for p in state.personas if p.username != state.seed_username), state.personas[0]
+    )
+    return estimate_tokens(
+        "You are good at writing natural, non-salesy Reddit posts.",
+        build_post_prompt(state),
+        *build_comment_prompt(state, commenter, None),
+    )
+
+
+def generate_conversation_calendar(
+    config: Dict[str, Any],
+    llm: Optional[LargeLangModel] = None,
+    start_date: Optional[date] = None,
+    max_comments_per_thread: int = 6,
+    policy: Optional[SpeakerPolicy] = None,
+    seed: Optional[int] = None,
+    termination: Optional[TerminationPolicy] = None,
+    token_budget: Optional[int] = None,
+    engine: Optional[str] = None,
+    relevance: Optional[Any] = None,
+    placements: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Generate one week of threads in-process (plan_week + generate_thread).
+    The same seed, config, placement snapshot and LLM responses always
+    produce the same calendar.
+
+    `token_budget` (or `thread_policy.weekly_token_budget` in the config)
+    caps the estimated tokens spent on the whole week: threads the remaining
+    budget cannot cover are skipped, so a tight budget yields fewer posts.
+    A running thread always finishes its post and first comment, so the
+    total can overshoot by at most what one thread runs over the cheapest.
+    `engine` ("langgraph" or "native", default from `config["engine"]`)
+    picks the thread runner; both produce identical output.
+    """
+
+    if llm is None:
+        llm = tiered_llm_from_config(config)
+
+    if policy is None:
+        policy = speaker_policy_from_config(config)
+
+    if termination is None:
+        termination = termination_policy_from_config(config)
+
+    if token_budget is None:
+        token_budget = (config.get("thread_policy") or {}).get("weekly_token_budget")
+
+    if engine is None:
+        engine = config.get("engine", "langgraph")
+
+    assignments = plan_week(
+        config, start_date=start_date, seed=seed, relevance=relevance, placements=placements
+    )
+    budget = TokenBudget(
+        token_budget,
+        thread_floor=estimate_thread_floor(config, assignments[0]) if assignments else 0,
+    )
+
+    schedule: List[Dict[str, Any]] = []
+
+    for idx, assignment in enumerate(assignments):
+        if not budget.can_afford_thread():
+            continue
+        entry, tokens_used = generate_thread(
+            config,
+            assignment,
+            llm,
+            max_comments_per_thread=max_comments_per_thread,
+            policy=policy,
+            termination=termination,
+            token_allowance=budget.thread_allowance(len(assignments) - idx),
+            engine=engine,
+        )
+        budget.charge_thread(tokens_used)
+        schedule.append(entry)
+
     return schedule
 
 
+# ------------------------------------------------------------
+# Record / replay
+# ------------------------------------------------------------
+
+def record_conversation_calendar(
+    config: Dict[str, Any],
+    llm: Optional[LargeLangModel] = None,
+    start_date: Optional[date] = None,
+    max_comments_per_thread: int = 6,
+    seed: Optional[int] = None,
+    token_budget: Optional[int] = None,
+    relevance: Optional[Any] = None,
+) -> Tuple[List[Dict[str, Any]], RunManifest]:
+    """
+    Run the engine and capture everything needed to replay it offline,
+    including the placement snapshot taken from `relevance`.
+    """
+    if llm is None:
+        llm = tiered_llm_from_config(config)
+    if start_date is None:
+        start_date = date.today()
+    if seed is None:
+        seed = new_seed()
+    placements = placement_snapshot_for(config, relevance)
+
+    manifest = new_manifest(
+        config,
+        seed,
+        start_date=start_date,
+        max_comments_per_thread=max_comments_per_thread,
+        token_budget=token_budget,
+        placements=placements,
+    )
+    calendar = generate_conversation_calendar(
+        config,
+        llm=RecordingLLM(llm, manifest),
+        start_date=start_date,
+        max_comments_per_thread=max_comments_per_thread,
+        seed=seed,
+        token_budget=token_budget,
+        placements=placements,
+    )
+    return calendar, manifest
+
+
+def replay_conversation_calendar(
+    config: Dict[str, Any],
+    manifest: RunManifest,
+    engine: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Re-run a recorded calendar without any provider calls.
+    `engine` picks the thread runner; both replay the same calendar.
+    """
+    verify_manifest(manifest, config)
+    params = manifest.params
+
+    return generate_conversation_calendar(
+        config,
+        llm=ReplayLLM(manifest),
+        start_date=date.fromisoformat(params["start_date"]),
+        max_comments_per_thread=params["max_comments_per_thread"],
+        seed=manifest.seed,
+        token_budget=params.get("token_budget"),
+        placements=params.get("placements"),
+        engine=engine,
+    )
+
+
 # ------------------------------------------------------------
 # CLI Runner
 # ------------------------------------------------------------
@@ -425,15 +956,25 @@ def load_config(path: str) -> Dict[str, Any]:
 
 
 if __name__ == "__main__":
-    import sys
-    import json
-
-    if len(sys.argv) < 2:
-        print("Usage: python planning_engine.py data.json")
-        sys.exit(1)
-
-    cfg = load_config(sys.argv[1])
-    calendar = generate_conversation_calendar(cfg)
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Generate a week of Reddit threads.")
+    parser.add_argument("config", help="Path to data.json")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--record", metavar="MANIFEST", help="Save a run manifest to this path")
+    parser.add_argument("--replay", metavar="MANIFEST", help="Replay a run manifest offline")
+    args = parser.parse_args()
+
+    cfg = load_config(args.config)
+
+    if args.replay:
+        calendar = replay_conversation_calendar(cfg, RunManifest.load(args.replay))
+    elif args.record:
+        calendar, manifest = record_conversation_calendar(cfg, seed=args.seed)
+        manifest.save(args.record)
+        print(f"Saved run manifest (seed {manifest.seed}) to: {args.record}")
+    else:
+        calendar = generate_conversation_calendar(cfg, seed=args.seed)
 
     # ---- SAVE TO JSON FILE ----
     output_path = "conversation_output.json"
@@ -0,0 +1,191 @@
+import re
+import threading
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+# ------------------------------------------------------------
+# Keyword -> subreddit relevance
+#
+# Subreddits are profiled with hashed word n-gram counts built from
+# their name, description and past post text. Keywords are scored
+# against every subreddit in one TF-IDF cosine matmul, and placements
+# are sampled from the resulting distribution.
+#
+# The index changes as posts are saved, so a seed alone does not pin
+# placements down: runs record a placement snapshot (or its fingerprint)
+# and replay from that instead of from the live index.
+# ------------------------------------------------------------
+
+DEFAULT_DIM = 2 ** 14
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_CAMEL_RE = re.compile(r"(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])")
+
+
+def clean_subreddit(name: str) -> str:
+    return name.replace("r/", "").strip()
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+def subreddit_name_text(name: str) -> str:
+    """
+    "r/GoogleSlides" -> "googleslides google slides"
+    """
+    clean = clean_subreddit(name)
+    return f"{clean} {_CAMEL_RE.sub(' ', clean)}"
+
+
+def _bucket(term: str, dim: int) -> int:
+    # crc32 is stable across processes (unlike hash()), so placements are reproducible
+    return zlib.crc32(term.encode("utf-8")) % dim
+
+
+def hashed_counts(text: str, dim: int = DEFAULT_DIM) -> np.ndarray:
+    """
+    Unigram + bigram counts hashed into a fixed-size vector.
+    """
+    tokens = tokenize(text)
+    terms = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    vec = np.zeros(dim, dtype=np.float64)
+    if terms:
+        np.add.at(vec, [_bucket(t, dim) for t in terms], 1.0)
+    return vec
+
+
+class RelevanceIndex:
+    """
+    Incrementally updated subreddit profiles. `add_documents` only touches one
+    row; the TF-IDF matrix is recomputed lazily (and cheaply) on the next score.
+    """
+
+    def __init__(
+        self,
+        subreddits: Sequence[str],
+        descriptions: Optional[Dict[str, str]] = None,
+        dim: int = DEFAULT_DIM,
+    ):
+        self.subreddits = list(subreddits)
+        self.dim = dim
+        self._rows = {clean_subreddit(s): i for i, s in enumerate(self.subreddits)}
+        self._counts = np.zeros((len(self.subreddits), dim), dtype=np.float64)
+        self._matrix: Optional[np.ndarray] = None
+        self._idf: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+        descriptions = {clean_subreddit(k): v for k, v in (descriptions or {}).items()}
+        for sub in self.subreddits:
+            # Names carry the strongest signal early on, before any posts exist
+            text = " ".join([subreddit_name_text(sub)] * 3)
+            desc = descriptions.get(clean_subreddit(sub))
+            if desc:
+                text = f"{text} {desc}"
+            self._counts[self._rows[clean_subreddit(sub)]] += hashed_counts(text, dim)
+
+    # ------------------------------------------------------------------
+    def add_documents(self, subreddit: str, texts: Iterable[str]) -> bool:
+        """
+        Fold new content into one subreddit's profile. Returns False for unknown subreddits.
+        """
+        row = self._rows.get(clean_subreddit(subreddit))
+        if row is None:
+            return False
+
+        delta = np.zeros(self.dim, dtype=np.float64)
+        for text in texts:
+            if text:
+                delta += hashed_counts(text, self.dim)
+
+        with self._lock:
+            self._counts[row] += delta
+            self._matrix = None
+        return True
+
+    def _tfidf_matrix(self):
+        with self._lock:
+            if self._matrix is None:
+                n_docs = self._counts.shape[0]
+                df = np.count_nonzero(self._counts, axis=0)
+                idf = np.log((1.0 + n_docs) / (1.0 + df)) + 1.0
+                weighted = np.log1p(self._counts) * idf
+                norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+                self._matrix = weighted / np.where(norms == 0, 1.0, norms)
+                self._idf = idf
+            return self._matrix, self._idf
+
+    def score(self, keywords: Sequence[str]) -> np.ndarray:
+        """
+        Cosine relevance of every keyword x subreddit pair, shape (len(keywords), n_subreddits).
+        """
+        matrix, idf = self._tfidf_matrix()
+        queries = np.vstack([hashed_counts(k, self.dim) for k in keywords]) if keywords else \
+            np.zeros((0, self.dim))
+        queries = np.log1p(queries) * idf
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries /= np.where(norms == 0, 1.0, norms)
+        return queries @ matrix.T
+
+    def placement_probabilities(
+        self,
+        keywords: Sequence[str],
+        temperature: float = 0.05,
+        exploration: float = 0.1,
+    ) -> np.ndarray:
+        """
+        Softmax over relevance per keyword, mixed with a little uniform
+        exploration so low-scoring subreddits still get the odd post.
+        """
+        scores = self.score(keywords)
+        if scores.size == 0:
+            return scores
+        logits = scores / max(temperature, 1e-6)
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+        uniform = 1.0 / probs.shape[1]
+        return (1.0 - exploration) * probs + exploration * uniform
+
+def relevance_index_from_config(
+    config: Dict,
+    corpus: Optional[Dict[str, List[str]]] = None,
+    descriptions: Optional[Dict[str, str]] = None,
+) -> RelevanceIndex:
+    """
+    Build an index for the config's subreddits. `corpus` maps subreddit -> past
+    post texts; `descriptions` overrides/extends `config["subreddit_descriptions"]`.
+    """
+    merged = dict(config.get("subreddit_descriptions") or {})
+    merged.update(descriptions or {})
+
+    index = RelevanceIndex(config["subreddits"], descriptions=merged)
+    for sub, texts in (corpus or {}).items():
+        index.add_documents(sub, texts)
+    return index
+
+
+def placement_options(config: Dict) -> Dict[str, float]:
+    opts = config.get("placement") or {}
+    return {
+        "temperature": float(opts.get("temperature", 0.05)),
+        "exploration": float(opts.get("exploration", 0.1)),
+    }
+
+
+def placement_snapshot(config: Dict, index: Optional[RelevanceIndex] = None) -> Dict[str, Any]:
+    """
+    Placement probabilities for every configured keyword, frozen as plain
+    JSON: {"subreddits": [...], "weights": {keyword: [p, ...]}}.
+    """
+    if index is None:
+        index = relevance_index_from_config(config)
+    keywords = [k["keyword"] for k in config["keywords"]]
+    probs = index.placement_probabilities(keywords, **placement_options(config))
+    return {
+        "subreddits": list(index.subreddits),
+        "weights": {k: row for k, row in zip(keywords, probs.tolist())},
+    }
+
@@ -0,0 +1,355 @@
+import gzip
+import hashlib
+import json
+import os
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, inspect, text
+from sqlalchemy.orm import Session
+
+from models import ArchivedPost, Comment, IdempotencyRecord, Post, Subreddit, User, week_start
+
+# ------------------------------------------------------------
+# Retention: weekly buckets + compressed archives
+#
+# Posts are bucketed by the week of created_at (comments follow their
+# post). Buckets older than the horizon are written to gzip'd JSONL files (one per week, plus
+# a manifest) and removed from the hot tables; archived_posts keeps the
+# post_id -> file index so /post/{id} can still serve them.
+# ------------------------------------------------------------
+
+ARCHIVE_DIR = os.environ.get("OGTOOL_ARCHIVE_DIR", "archive")
+HORIZON_WEEKS = int(os.environ.get("OGTOOL_ARCHIVE_HORIZON_WEEKS", "12"))
+IDEMPOTENCY_TTL_HOURS = int(os.environ.get("OGTOOL_IDEMPOTENCY_TTL_HOURS", "24"))
+MANIFEST_NAME = "manifest.json"
+
+
+# ------------------------------------------------------------
+# Migration: add + backfill posts.week_bucket on existing databases
+# ------------------------------------------------------------
+
+def ensure_week_buckets(engine) -> None:
+    """
+    create_all() never alters existing tables, so add the bucket column and
+    its index (and backfill them) for databases created before retention
+    existed. Portable across SQLite, Postgres and MySQL.
+    """
+    inspector = inspect(engine)
+    columns = {c["name"] for c in inspector.get_columns("posts")}
+    indexes = {i["name"] for i in inspector.get_indexes("posts")}
+    bucket_index = next(
+        i for i in Post.__table__.indexes if [c.name for c in i.columns] == ["week_bucket"]
+    )
+
+    with engine.begin() as conn:
+        if "week_bucket" not in columns:
+            conn.execute(text("ALTER TABLE posts ADD COLUMN week_bucket DATE"))
+        if bucket_index.name not in indexes:
+            bucket_index.create(conn)
+
+    with Session(engine) as db:
+        rows = (
+            db.query(Post.id, Post.created_at)
+            .filter(Post.week_bucket.is_(None))
+            .yield_per(1000)
+        )
+        updates = [
+            {"id": row_id, "week_bucket": week_start(created or datetime.utcnow())}
+            for row_id, created in rows
+        ]
+        for i in range(0, len(updates), 1000):
+            db.bulk_update_mappings(Post, updates[i:i + 1000])
+        db.commit()
+
+
+# ------------------------------------------------------------
+# Serialization
+# ------------------------------------------------------------
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value else None
+
+
+def serialize_thread(db: Session, post: Post, usernames: Dict[int, str]) -> Dict[str, Any]:
+    comments = db.query(Comment).filter_by(post_id=post.id).order_by(Comment.id).all()
+    subreddit = db.query(Subreddit.name).filter_by(id=post.subreddit_id).scalar()
+    return {
+        "id": post.id,
+        "subreddit": subreddit,
+        "author": usernames.get(post.user_id),
+        "title": post.title,
+        "body": post.body,
+        "query_id": post.query_id,
+        "query_text": post.query_text,
+        "created_at": _iso(post.created_at),
+        "week_bucket": post.week_bucket.isoformat() if post.week_bucket else None,
+        "comments": [
+            {
+                "id": c.id,
+                "text": c.text,
+                "author": usernames.get(c.user_id),
+                "parent_comment_id": c.parent_comment_id,
+                "created_at": _iso(c.created_at),
+            }
+            for c in comments
+        ],
+    }
+
+
+def thread_to_response(thread: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Same shape as GET /post/{id} for a hot post, plus `archived: true`.
+    """
+    nodes = {c["id"]: {**c, "children": []} for c in thread["comments"]}
+    roots = []
+    for c in thread["comments"]:
+        node = nodes[c["id"]]
+        node.pop("created_at", None)
+        parent = nodes.get(c["parent_comment_id"])
+        if parent is not None:
+            parent["children"].append(node)
+        else:
+            roots.append(node)
+
+    return {
+        "id": thread["id"],
+        "title": thread["title"],
+        "body": thread["body"],
+        "query_id": thread["query_id"],
+        "query_text": thread["query_text"],
+        "created_at": thread["created_at"],
+        "comments": roots,
+        "archived": True,
+    }
+
+
+# ------------------------------------------------------------
+# Manifest
+# ------------------------------------------------------------
+
+def _manifest_path(archive_dir: str) -> str:
+    return os.path.join(archive_dir, MANIFEST_NAME)
+
+
+def load_manifest(archive_dir: str = ARCHIVE_DIR) -> Dict[str, Any]:
+    path = _manifest_path(archive_dir)
+    if not os.path.exists(path):
+        return {"files": []}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_manifest(archive_dir: str, manifest: Dict[str, Any]) -> None:
+    tmp = _manifest_path(archive_dir) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=4)
+    os.replace(tmp, _manifest_path(archive_dir))
+
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ------------------------------------------------------------
+# Archive job
+# ------------------------------------------------------------
+
+def archivable_weeks(db: Session, horizon_weeks: int, today: Optional[date] = None) -> List[date]:
+    cutoff = week_start(today or date.today()) - timedelta(weeks=horizon_weeks)
+    rows = (
+        db.query(Post.week_bucket)
+        .filter(Post.week_bucket < cutoff)
+        .distinct()
+        .order_by(Post.week_bucket)
+        .all()
+    )
+    return [week for (week,) in rows]
+
+
+def archive_week(db: Session, week: date, archive_dir: str = ARCHIVE_DIR) -> Dict[str, Any]:
+    """
+    Move one week bucket out of the hot tables. The file is written and
+    fsynced before the hot rows are deleted, so a crash never loses data
+    (at worst a rerun writes a second part file for the same week).
+    """
+    posts = db.query(Post).filter(Post.week_bucket == week).order_by(Post.id).all()
+    if not posts:
+        return {}
+
+    usernames = dict(db.query(User.id, User.username).all())
+    os.makedirs(archive_dir, exist_ok=True)
+
+    part = 1
+    while os.path.exists(os.path.join(archive_dir, f"week_{week.isoformat()}.part{part}.jsonl.gz")):
+        part += 1
+    filename = f"week_{week.isoformat()}.part{part}.jsonl.gz"
+    path = os.path.join(archive_dir, filename)
+
+    comment_count = 0
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for post in posts:
+            thread = serialize_thread(db, post, usernames)
+            comment_count += len(thread["comments"])
+            f.write(json.dumps(thread, ensure_ascii=False) + "\n")
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+    post_ids = [p.id for p in posts]
+    for post in posts:
+        db.merge(ArchivedPost(
+            post_id=post.id,
+            week_bucket=week,
+            subreddit_id=post.subreddit_id,
+            title=post.title,
+            archive_file=filename,
+        ))
+    db.query(Comment).filter(Comment.post_id.in_(post_ids)).delete(synchronize_session=False)
+    db.query(Post).filter(Post.id.in_(post_ids)).delete(synchronize_session=False)
+    db.commit()
+
+    entry = {
+        "file": filename,
+        "week": week.isoformat(),
+        "posts": len(post_ids),
+        "comments": comment_count,
+        "min_post_id": min(post_ids),
+        "max_post_id": max(post_ids),
+        "sha256": _sha256(path),
+        "archived_at": datetime.utcnow().isoformat(),
+    }
+    manifest = load_manifest(archive_dir)
+    manifest["files"].append(entry)
+    _write_manifest(archive_dir, manifest)
+    return entry
+
+
+def archive_old_content(
+    db: Session,
+    horizon_weeks: int = HORIZON_WEEKS,
+    archive_dir: str = ARCHIVE_DIR,
+    today: Optional[date] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Archive every week bucket older than `horizon_weeks`. Returns the manifest entries written.
+    """
+    return [
+        entry
+        for week in archivable_weeks(db, horizon_weeks, today)
+        for entry in [archive_week(db, week, archive_dir)]
+        if entry
+    ]
+
+
+# ------------------------------------------------------------
+# Idempotency records: stored responses are only replayed for a day
+# ------------------------------------------------------------
+
+def idempotency_cutoff(ttl_hours: int = IDEMPOTENCY_TTL_HOURS) -> datetime:
+    """
+    Records created before this are expired and no longer replayed.
+    """
+    return datetime.utcnow() - timedelta(hours=ttl_hours)
+
+
+def purge_idempotency_records(db: Session, ttl_hours: int = IDEMPOTENCY_TTL_HOURS) -> int:
+    """
+    Delete expired idempotency records. Returns how many were removed.
+    """
+    purged = (
+        db.query(IdempotencyRecord)
+        .filter(IdempotencyRecord.created_at < idempotency_cutoff(ttl_hours))
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return purged
+
+
+# ------------------------------------------------------------
+# Read-through
+# ------------------------------------------------------------
+
+@lru_cache(maxsize=8)
+def _load_archive_file(path: str, mtime: float) -> Dict[int, Dict[str, Any]]:
+    threads = {}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            thread = json.loads(line)
+            threads[thread["id"]] = thread
+    return threads
+
+
+def load_archived_thread(
+    db: Session,
+    post_id: int,
+    archive_dir: str = ARCHIVE_DIR,
+) -> Optional[Dict[str, Any]]:
+    """
+    Return an archived thread in the /post/{id} response shape, or None.
+    """
+    record = db.query(ArchivedPost).filter_by(post_id=post_id).first()
+    if record is None:
+        return None
+
+    path = os.path.join(archive_dir, record.archive_file)
+    if not os.path.exists(path):
+        return None
+
+    thread = _load_archive_file(path, os.path.getmtime(path)).get(post_id)
+    return thread_to_response(thread) if thread else None
+
+
+def hot_table_stats(db: Session) -> Dict[str, Any]:
+    oldest = db.query(func.min(Post.week_bucket)).scalar()
+    return {
+        "posts": db.query(func.count(Post.id)).scalar(),
+        "comments": db.query(func.count(Comment.id)).scalar(),
+        "archived_posts": db.query(func.count(ArchivedPost.post_id)).scalar(),
+        "oldest_hot_week": oldest.isoformat() if oldest else None,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from database import SessionLocal, engine
+
+    parser = argparse.ArgumentParser(description="Archive old posts/comments out of the hot tables.")
+    parser.add_argument("--migrate", action="store_true", help="Add/backfill posts.week_bucket")
+    parser.add_argument("--archive", action="store_true", help="Archive weeks older than the horizon")
+    parser.add_argument("--horizon-weeks", type=int, default=HORIZON_WEEKS)
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    parser.add_argument("--purge-idempotency", action="store_true",
+                        help="Delete expired Idempotency-Key records (also done by --archive)")
+    parser.add_argument("--idempotency-ttl-hours", type=int, default=IDEMPOTENCY_TTL_HOURS)
+    args = parser.parse_args()
+
+    if not (args.migrate or args.archive or args.purge_idempotency):
+        parser.error("nothing to do: pass --migrate, --archive and/or --purge-idempotency")
+
+    if args.migrate:
+        ensure_week_buckets(engine)
+        print("posts.week_bucket ready.")
+
+    if args.archive:
+        session = SessionLocal()
+        try:
+            written = archive_old_content(session, args.horizon_weeks, args.archive_dir)
+            for e in written:
+                print(f"Archived {e['week']}: {e['posts']} posts, {e['comments']} comments -> {e['file']}")
+            print(json.dumps(hot_table_stats(session), indent=2))
+        finally:
+            session.close()
+
+    if args.archive or args.purge_idempotency:
+        session = SessionLocal()
+        try:
+            purged = purge_idempotency_records(session, args.idempotency_ttl_hours)
+            print(f"Purged {purged} expired idempotency records.")
+        finally:
+            session.close()
@@ -0,0 +1,100 @@
+import hashlib
+import json
+from collections import defaultdict, deque
+from dataclasses import dataclass, field, asdict
+from datetime import date
+from typing import Any, Deque, Dict, List
+
+# ------------------------------------------------------------
+# Run manifests: record a seeded run, replay it offline
+# ------------------------------------------------------------
+
+
+class ReplayMismatchError(RuntimeError):
+    """
+    Raised when a replayed run asks for a completion that was never recorded.
+    """
+
+
+def config_hash(config: Dict[str, Any]) -> str:
+    """
+    Stable hash of a planning config (key order does not matter).
+    """
+    payload = json.dumps(config, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def prompt_key(system_prompt: str, user_prompt: str) -> str:
+    payload = f"{system_prompt}\x00{user_prompt}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class RunManifest:
+    seed: int
+    config_hash: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    responses: List[Dict[str, str]] = field(default_factory=list)
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f, indent=4, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "RunManifest":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(**json.load(f))
+
+
+class RecordingLLM:
+    """
+    Wraps any LLM with a `complete()` method and logs every response
+    into the manifest, keyed by a hash of the prompts.
+    """
+
+    def __init__(self, llm: Any, manifest: RunManifest):
+        self.llm = llm
+        self.manifest = manifest
+
+    def complete(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
+        text = self.llm.complete(system_prompt, user_prompt, **kwargs)
+        self.manifest.responses.append(
+            {"key": prompt_key(system_prompt, user_prompt), "response": text}
+        )
+        return text
+
+
+class ReplayLLM:
+    """
+    Serves recorded responses back without touching any provider.
+    Identical prompts are answered in the order they were recorded.
+    """
+
+    def __init__(self, manifest: RunManifest):
+        self._responses: Dict[str, Deque[str]] = defaultdict(deque)
+        for entry in manifest.responses:
+            self._responses[entry["key"]].append(entry["response"])
+
+    def complete(self, system_prompt: str, user_prompt: str, **kwargs) -> str:
+        queue = self._responses.get(prompt_key(system_prompt, user_prompt))
+        if not queue:
+            raise ReplayMismatchError(
+                "No recorded response for this prompt; the config, seed or engine changed."
+            )
+        return queue.popleft()
+
+
+def verify_manifest(manifest: RunManifest, config: Dict[str, Any]) -> None:
+    current = config_hash(config)
+    if manifest.config_hash != current:
+        raise ReplayMismatchError(
+            f"Config hash mismatch: manifest {manifest.config_hash[:12]}, config {current[:12]}"
+        )
+
+
+def new_manifest(config: Dict[str, Any], seed: int, **params: Any) -> RunManifest:
+    return RunManifest(
+        seed=seed,
+        config_hash=config_hash(config),
+        params={k: (v.isoformat() if isinstance(v, date) else v) for k, v in params.items()},
+    )
@@ -0,0 +1,89 @@
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# ------------------------------------------------------------
+# Startup-time report
+#
+# Imports a module in a fresh interpreter with `-X importtime` and
+# sums the cumulative import time per top-level package, so you can
+# see what a cold start actually pays for.
+# ------------------------------------------------------------
+
+# Modules that should NOT be imported by a read-only boot
+LAZY_MODULES = ("langgraph", "langchain_core", "langchain_groq", "langchain_openai", "numpy")
+
+
+def measure_imports(target: str = "main") -> Tuple[float, Dict[str, float], List[str]]:
+    """
+    Returns (total seconds, {module imported directly by target: cumulative seconds},
+    every module name imported while importing target).
+    """
+    env = dict(os.environ)
+    env.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["unknown error"]
+        raise RuntimeError(f"Importing {target} failed: {tail[0]}")
+
+    # -X importtime prints children before their parent; a top-level line
+    # (one leading space) closes the subtree collected since the previous one.
+    subtree: List[Tuple[int, str, float]] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, raw_name = line[len("import time:"):].split("|")
+        indent = len(raw_name) - len(raw_name.lstrip())
+        name = raw_name.strip()
+        seconds = int(cumulative) / 1e6
+
+        if indent > 1:
+            subtree.append((indent, name, seconds))
+            continue
+        if name == target:
+            direct = {n: sec for ind, n, sec in subtree if ind == 3}
+            return seconds, direct, [n for _, n, _ in subtree]
+        subtree = []
+
+    raise RuntimeError(f"No import timing found for {target}")
+
+
+def format_report(
+    target: str,
+    total: float,
+    per_module: Dict[str, float],
+    imported: List[str],
+    top: int,
+) -> List[str]:
+    rows = sorted(per_module.items(), key=lambda kv: kv[1], reverse=True)
+    lines = [f"import {target}: {total * 1000:.1f} ms total", ""]
+    for name, seconds in rows[:top]:
+        lines.append(f"  {name:<28} {seconds * 1000:8.1f} ms")
+
+    packages = {name.split(".")[0] for name in imported}
+    eager = [m for m in LAZY_MODULES if m in packages]
+    lines.append("")
+    if eager:
+        lines.append(f"WARNING: imported eagerly: {', '.join(eager)}")
+    else:
+        lines.append("OK: no provider SDKs / langgraph imported at startup")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Report import time per module at startup.")
+    parser.add_argument("target", nargs="?", default="main", help="Module to import (default: main)")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    total_s, direct, imported_names = measure_imports(args.target)
+    print("\n".join(format_report(args.target, total_s, direct, imported_names, args.top)))
@@ -0,0 +1,253 @@
+import json
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from models import GenerationTask
+
+# ------------------------------------------------------------
+# DB-backed task queue for distributed generation
+#
+# Each row is one planned thread. Workers claim rows with
+# SELECT ... FOR UPDATE SKIP LOCKED (so any number of them can poll the
+# same table without blocking each other), hold a renewable lease while
+# generating, and write the result back. Expired leases make a task
+# claimable again, so a task may run more than once; its thread is
+# saved in the same transaction that marks it done (and only while the
+# lease is still held), so it is saved exactly once.
+#
+# SQLite has no row locks, so there a claim is a conditional UPDATE
+# that only one worker can win.
+# ------------------------------------------------------------
+
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Dialects that understand FOR UPDATE SKIP LOCKED
+SKIP_LOCKED_DIALECTS = ("postgresql", "mysql", "mariadb", "oracle")
+
+
+def new_batch_id() -> str:
+    return uuid.uuid4().hex
+
+
+# ------------------------------------------------------------
+# Producer side
+# ------------------------------------------------------------
+
+def enqueue_assignments(
+    db: Session,
+    assignments: List[Dict[str, Any]],
+    params: Dict[str, Any],
+    batch_id: Optional[str] = None,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+) -> str:
+    """
+    Queue one task per planned thread (see planning_engine.plan_week).
+    `params` (config, max_comments_per_thread, token_allowance, engine) is
+    copied into every task so workers need nothing but the database.
+    """
+    batch_id = batch_id or new_batch_id()
+    db.add_all([
+        GenerationTask(
+            batch_id=batch_id,
+            status=PENDING,
+            payload=json.dumps({"assignment": a, **params}, ensure_ascii=False),
+            max_attempts=max_attempts,
+        )
+        for a in assignments
+    ])
+    db.commit()
+    return batch_id
+
+
+def batch_status(db: Session, batch_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Progress of one batch; `data` holds the finished calendar entries in plan order.
+    """
+    tasks = db.query(GenerationTask).filter_by(batch_id=batch_id).order_by(GenerationTask.id).all()
+    if not tasks:
+        return None
+
+    counts = Counter(t.status for t in tasks)
+    return {
+        "batch_id": batch_id,
+        "total": len(tasks),
+        "counts": {s: counts.get(s, 0) for s in (PENDING, RUNNING, DONE, FAILED)},
+        "finished": counts.get(DONE, 0) + counts.get(FAILED, 0) == len(tasks),
+        "errors": [{"task_id": t.id, "error": t.error} for t in tasks if t.status == FAILED],
+        "data": [json.loads(t.result)["entry"] for t in tasks if t.status == DONE],
+    }
+
+
+# ------------------------------------------------------------
+# Worker side
+# ------------------------------------------------------------
+
+def _claimable(now: datetime):
+    return and_(
+        GenerationTask.attempts < GenerationTask.max_attempts,
+        or_(
+            GenerationTask.status == PENDING,
+            and_(GenerationTask.status == RUNNING, GenerationTask.lease_expires_at < now),
+        ),
+    )
+
+
+def _lease_values(worker_id: str, lease_seconds: int, now: datetime) -> Dict[Any, Any]:
+    return {
+        GenerationTask.status: RUNNING,
+        GenerationTask.worker_id: worker_id,
+        GenerationTask.lease_expires_at: now + timedelta(seconds=lease_seconds),
+        GenerationTask.attempts: GenerationTask.attempts + 1,
+        GenerationTask.error: None,
+    }
+
+
+def claim_task(
+    db: Session,
+    worker_id: str,
+    lease_seconds: int = DEFAULT_LEASE_SECONDS,
+) -> Optional[GenerationTask]:
+    """
+    Take the oldest pending (or lease-expired) task, or return None.
+    """
+    now = datetime.utcnow()
+    candidates = (
+        db.query(GenerationTask)
+        .filter(_claimable(now))
+        .order_by(GenerationTask.id)
+    )
+
+    if db.bind.dialect.name in SKIP_LOCKED_DIALECTS:
+        task = candidates.with_for_update(skip_locked=True).first()
+        if task is None:
+            db.rollback()
+            return None
+        db.query(GenerationTask).filter_by(id=task.id).update(
+            _lease_values(worker_id, lease_seconds, now), synchronize_session=False
+        )
+        db.commit()
+        db.refresh(task)
+        return task
+
+    # SQLite: optimistic claim; the WHERE clause makes losing a race a no-op
+    for (task_id,) in candidates.with_entities(GenerationTask.id).limit(16).all():
+        won = (
+            db.query(GenerationTask)
+            .filter(GenerationTask.id == task_id, _claimable(now))
+            .update(_lease_values(worker_id, lease_seconds, now), synchronize_session=False)
+        )
+        db.commit()
+        if won:
+            return db.get(GenerationTask, task_id)
+    return None
+
+
+def _owned(task_id: int, worker_id: str):
+    return and_(
+        GenerationTask.id == task_id,
+        GenerationTask.worker_id == worker_id,
+        GenerationTask.status == RUNNING,
+    )
+
+
+def renew_lease(
+    db: Session,
+    task_id: int,
+    worker_id: str,
+    lease_seconds: int = DEFAULT_LEASE_SECONDS,
+) -> bool:
+    """
+    Extend the lease. False means the task was reclaimed by another worker.
+    """
+    renewed = (
+        db.query(GenerationTask)
+        .filter(_owned(task_id, worker_id))
+        .update(
+            {GenerationTask.lease_expires_at: datetime.utcnow() + timedelta(seconds=lease_seconds)},
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return bool(renewed)
+
+
+def complete_task(
+    db: Session,
+    task_id: int,
+    worker_id: str,
+    result: Dict[str, Any],
+    commit: bool = True,
+) -> bool:
+    """
+    Mark an owned task done. With `commit=False` the update joins the
+    caller's transaction (and holds the task's row lock until it commits),
+    so saving the thread and completing the task succeed or fail together.
+    """
+    done = (
+        db.query(GenerationTask)
+        .filter(_owned(task_id, worker_id))
+        .update(
+            {
+                GenerationTask.status: DONE,
+                GenerationTask.result: json.dumps(result, ensure_ascii=False),
+                GenerationTask.lease_expires_at: None,
+            },
+            synchronize_session=False,
+        )
+    )
+    if commit:
+        db.commit()
+    return bool(done)
+
+
+def fail_task(db: Session, task_id: int, worker_id: str, error: str) -> Optional[str]:
+    """
+    Release a task after an error: back to pending while attempts remain,
+    otherwise failed. Returns the new status (None if no longer owned).
+    """
+    task = db.query(GenerationTask).filter(_owned(task_id, worker_id)).first()
+    if task is None:
+        db.rollback()
+        return None
+
+    status = PENDING if task.attempts < task.max_attempts else FAILED
+    db.query(GenerationTask).filter(_owned(task_id, worker_id)).update(
+        {
+            GenerationTask.status: status,
+            GenerationTask.error: error,
+            GenerationTask.worker_id: None,
+            GenerationTask.lease_expires_at: None,
+        },
+        synchronize_session=False,
+    )
+    db.commit()
+    return status
+
+
+def fail_exhausted_tasks(db: Session) -> int:
+    """
+    Mark tasks whose last lease expired with no attempts left as failed
+    (their workers crashed on every try).
+    """
+    failed = (
+        db.query(GenerationTask)
+        .filter(
+            GenerationTask.status == RUNNING,
+            GenerationTask.lease_expires_at < datetime.utcnow(),
+            GenerationTask.attempts >= GenerationTask.max_attempts,
+        )
+        .update(
+            {GenerationTask.status: FAILED, GenerationTask.error: "lease expired"},
+            synchronize_session=False,
+        )
+    )
+    db.commit()
+    return failed
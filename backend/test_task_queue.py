@@ -0,0 +1,233 @@
+import json
+import os
+import threading
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# worker.py imports database.py, which refuses to load without a URL;
+# the tests below never touch that engine, only their own temp database
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+from models import Base, Comment, GenerationTask, Post
+from task_queue import (
+    DONE,
+    FAILED,
+    PENDING,
+    RUNNING,
+    claim_task,
+    complete_task,
+    enqueue_assignments,
+    fail_exhausted_tasks,
+)
+from worker import save_and_complete
+
+# ------------------------------------------------------------
+# Task queue + worker save path on a temporary SQLite database
+# ------------------------------------------------------------
+
+ENTRY = {
+    "date": "2026-01-05",
+    "subreddit": "r/PowerPoint",
+    "post": {
+        "post_id": "P1",
+        "subreddit": "r/PowerPoint",
+        "author": "riley_ops",
+        "title": "Deck formatting takes forever",
+        "body": "Any tips for keeping client decks consistent?",
+        "query": "powerpoint formatting",
+    },
+    "comments": [
+        {
+            "comment_id": "C1",
+            "post_id": "P1",
+            "parent_comment_id": None,
+            "author": "jordan_consults",
+            "text": "Master slides saved me hours.",
+        },
+        {
+            "comment_id": "C2",
+            "post_id": "P1",
+            "parent_comment_id": "C1",
+            "author": "riley_ops",
+            "text": "Thanks, will try that.",
+        },
+    ],
+}
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'queue.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    Base.metadata.create_all(engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+def enqueue(Session, n=1, max_attempts=3):
+    db = Session()
+    try:
+        assignments = [{"post_id": f"P{i + 1}"} for i in range(n)]
+        return enqueue_assignments(db, assignments, {"config": {}}, max_attempts=max_attempts)
+    finally:
+        db.close()
+
+
+def claim(Session, worker_id, lease_seconds=300):
+    db = Session()
+    try:
+        task = claim_task(db, worker_id, lease_seconds)
+        return None if task is None else (task.id, task.worker_id, task.attempts)
+    finally:
+        db.close()
+
+
+def task_row(Session, task_id):
+    db = Session()
+    try:
+        task = db.get(GenerationTask, task_id)
+        db.expunge(task)
+        return task
+    finally:
+        db.close()
+
+
+def test_racing_workers_claim_a_task_once(sessions):
+    for _ in range(10):
+        enqueue(sessions)
+
+    for _ in range(10):
+        barrier = threading.Barrier(2)
+        claimed = {}
+
+        def race(worker_id):
+            barrier.wait()
+            claimed[worker_id] = claim(sessions, worker_id)
+
+        racers = [threading.Thread(target=race, args=(w,)) for w in ("w1", "w2")]
+        for t in racers:
+            t.start()
+        for t in racers:
+            t.join()
+
+        # Each worker got its own task (or nothing); never the same row twice
+        ids = [c[0] for c in claimed.values() if c is not None]
+        assert len(ids) == len(set(ids))
+
+    db = sessions()
+    try:
+        tasks = db.query(GenerationTask).all()
+        assert all(t.status == RUNNING and t.attempts == 1 for t in tasks)
+    finally:
+        db.close()
+
+
+def test_single_task_race_has_one_winner(sessions):
+    for _ in range(10):
+        enqueue(sessions)
+        barrier = threading.Barrier(2)
+        claimed = {}
+
+        def race(worker_id):
+            barrier.wait()
+            claimed[worker_id] = claim(sessions, worker_id)
+
+        racers = [threading.Thread(target=race, args=(w,)) for w in ("w1", "w2")]
+        for t in racers:
+            t.start()
+        for t in racers:
+            t.join()
+
+        winners = [c for c in claimed.values() if c is not None]
+        assert len(winners) == 1
+        task_id, worker_id, attempts = winners[0]
+        assert task_row(sessions, task_id).worker_id == worker_id
+        assert attempts == 1
+
+
+def test_expired_lease_is_reclaimed(sessions):
+    enqueue(sessions)
+
+    first = claim(sessions, "w1", lease_seconds=-1)
+    second = claim(sessions, "w2")
+
+    assert second[0] == first[0]
+    assert second[1:] == ("w2", 2)
+    # A live lease is not up for grabs
+    assert claim(sessions, "w3") is None
+
+    # The first worker no longer owns the task
+    db = sessions()
+    try:
+        assert not complete_task(db, first[0], "w1", {"entry": ENTRY})
+    finally:
+        db.close()
+    assert task_row(sessions, first[0]).status == RUNNING
+
+
+def test_save_and_complete_rolls_back_after_lost_lease(sessions):
+    enqueue(sessions)
+    task_id, _, _ = claim(sessions, "w1", lease_seconds=-1)
+    claim(sessions, "w2")
+
+    db = sessions()
+    try:
+        assert not save_and_complete(db, task_id, "w1", {"entry": ENTRY})
+        assert db.query(Post).count() == 0
+        assert db.query(Comment).count() == 0
+    finally:
+        db.close()
+    task = task_row(sessions, task_id)
+    assert (task.status, task.worker_id, task.result) == (RUNNING, "w2", None)
+
+    # The worker holding the lease saves the thread exactly once
+    db = sessions()
+    try:
+        assert save_and_complete(db, task_id, "w2", {"entry": ENTRY})
+        assert db.query(Post).count() == 1
+        assert db.query(Comment).count() == 2
+    finally:
+        db.close()
+    task = task_row(sessions, task_id)
+    assert task.status == DONE
+    assert json.loads(task.result)["post_id"] is not None
+
+
+def test_fail_exhausted_tasks(sessions):
+    enqueue(sessions, max_attempts=1)
+    enqueue(sessions, max_attempts=3)
+
+    exhausted = claim(sessions, "w1", lease_seconds=-1)
+    retryable = claim(sessions, "w1", lease_seconds=-1)
+
+    db = sessions()
+    try:
+        assert fail_exhausted_tasks(db) == 1
+        # Nothing left to fail on a second pass
+        assert fail_exhausted_tasks(db) == 0
+    finally:
+        db.close()
+
+    task = task_row(sessions, exhausted[0])
+    assert (task.status, task.error) == (FAILED, "lease expired")
+    assert task_row(sessions, retryable[0]).status == RUNNING
+
+    # Only the task with attempts left is claimable again
+    assert claim(sessions, "w2")[0] == retryable[0]
+    assert claim(sessions, "w2") is None
+
+
+def test_enqueued_tasks_start_pending(sessions):
+    batch_id = enqueue(sessions, n=3)
+
+    db = sessions()
+    try:
+        tasks = db.query(GenerationTask).filter_by(batch_id=batch_id).all()
+        assert [t.status for t in tasks] == [PENDING] * 3
+        assert [json.loads(t.payload)["assignment"]["post_id"] for t in tasks] == ["P1", "P2", "P3"]
+    finally:
+        db.close()
@@ -0,0 +1,366 @@
+import random
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# ------------------------------------------------------------
+# Thread policies
+#
+# Decide *who* speaks next and *what* they reply to before any
+# LLM call is made, so unrealistic threads are never generated.
+# ------------------------------------------------------------
+
+
+def comment_depths(comments: List[Any]) -> Dict[str, int]:
+    """
+    Map comment_id -> depth (top-level comments have depth 1).
+    """
+    depths: Dict[str, int] = {}
+    for c in comments:
+        parent_depth = depths.get(c.parent_comment_id, 0) if c.parent_comment_id else 0
+        depths[c.comment_id] = parent_depth + 1
+    return depths
+
+
+class SpeakerPolicy:
+    """
+    Base class: pick the next (persona, parent comment) for a thread.
+
+    `parent=None` means a top-level reply to the post.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+
+    def select(self, state, rng: Optional[random.Random] = None) -> Tuple[Any, Optional[Any]]:
+        raise NotImplementedError
+
+
+class UniformSpeakerPolicy(SpeakerPolicy):
+    """
+    Original behaviour: uniform random persona and uniform random parent.
+    """
+
+    def select(self, state, rng: Optional[random.Random] = None):
+        rng = rng or self.rng
+        persona = rng.choice(state.personas)
+        parent = rng.choice([None] + state.comments)
+        return persona, parent
+
+
+@dataclass
+class RealisticPolicyConfig:
+    persona_weights: Dict[str, float] = field(default_factory=dict)
+    max_depth: int = 3
+    op_reply_probability: float = 0.6
+    top_level_weight: float = 1.5
+    allow_consecutive_author: bool = False
+
+
+class RealisticSpeakerPolicy(SpeakerPolicy):
+    """
+    Rules applied in order:
+    - OP answers unanswered direct replies to the post (with some probability).
+    - Nobody speaks twice in a row.
+    - OP never leaves a top-level comment on their own post.
+    - Nobody replies to their own comment.
+    - Replies never go deeper than `max_depth`.
+    - Remaining speakers are picked by persona weight.
+    """
+
+    def __init__(self, config: Optional[RealisticPolicyConfig] = None, seed: Optional[int] = None):
+        super().__init__(seed)
+        self.config = config or RealisticPolicyConfig()
+
+    # ------------------------------------------------------------------
+    def _weight(self, username: str) -> float:
+        return max(float(self.config.persona_weights.get(username, 1.0)), 0.0)
+
+    def _unanswered_top_level(self, state) -> List[Any]:
+        op = state.seed_username
+        # A reply to a top-level comment sits at depth 2
+        if self.config.max_depth < 2:
+            return []
+        answered = {
+            c.parent_comment_id for c in state.comments if c.author == op and c.parent_comment_id
+        }
+        return [
+            c for c in state.comments
+            if c.parent_comment_id is None and c.author != op and c.comment_id not in answered
+        ]
+
+    def _pick_speaker(self, state, rng: random.Random):
+        last_author = state.comments[-1].author if state.comments else None
+
+        candidates = state.personas
+        if not self.config.allow_consecutive_author and last_author:
+            candidates = [p for p in candidates if p.username != last_author] or candidates
+
+        # OP only speaks when there is something to reply to (never top-level),
+        # which also keeps OP from opening the thread
+        if not self._reply_targets(state, state.seed_username):
+            candidates = [p for p in candidates if p.username != state.seed_username] or candidates
+
+        weights = [self._weight(p.username) for p in candidates]
+        if sum(weights) <= 0:
+            return rng.choice(candidates)
+        return rng.choices(candidates, weights=weights, k=1)[0]
+
+    def _reply_targets(self, state, username: str) -> List[Any]:
+        """
+        Comments `username` may reply to: not their own, not at max depth.
+        """
+        depths = comment_depths(state.comments)
+        return [
+            c for c in state.comments
+            if c.author != username and depths.get(c.comment_id, 1) < self.config.max_depth
+        ]
+
+    def _pick_parent(self, state, speaker, rng: random.Random):
+        options: List[Optional[Any]] = []
+        weights: List[float] = []
+
+        # OP talks inside the thread, not as a fresh top-level comment
+        if speaker.username != state.seed_username:
+            options.append(None)
+            weights.append(self.config.top_level_weight)
+
+        for c in self._reply_targets(state, speaker.username):
+            options.append(c)
+            weights.append(1.0)
+
+        if not options:
+            return None
+        return rng.choices(options, weights=weights, k=1)[0]
+
+    # ------------------------------------------------------------------
+    def select(self, state, rng: Optional[random.Random] = None):
+        rng = rng or self.rng
+        last_author = state.comments[-1].author if state.comments else None
+        op_can_speak = self.config.allow_consecutive_author or last_author != state.seed_username
+
+        unanswered = self._unanswered_top_level(state)
+        if unanswered and op_can_speak and rng.random() < self.config.op_reply_probability:
+            op = next((p for p in state.personas if p.username == state.seed_username), None)
+            if op is not None:
+                return op, rng.choice(unanswered)
+
+        speaker = self._pick_speaker(state, rng)
+        parent = self._pick_parent(state, speaker, rng)
+        return speaker, parent
+
+
+# ------------------------------------------------------------
+# Config helpers
+# ------------------------------------------------------------
+
+SPEAKER_POLICIES = {
+    "uniform": UniformSpeakerPolicy,
+    "realistic": RealisticSpeakerPolicy,
+}
+
+
+def speaker_policy_from_config(config: Dict[str, Any], seed: Optional[int] = None) -> SpeakerPolicy:
+    """
+    Build a speaker policy from the optional `thread_policy` block of the config:
+
+        "thread_policy": {
+            "speaker": "realistic",
+            "max_depth": 3,
+            "op_reply_probability": 0.6,
+            "persona_weights": {"riley_ops": 2.0}
+        }
+    """
+    opts = dict(config.get("thread_policy") or {})
+    name = opts.pop("speaker", "realistic")
+
+    if name not in SPEAKER_POLICIES:
+        raise ValueError(f"Unknown speaker policy: {name}")
+
+    if name == "uniform":
+        return UniformSpeakerPolicy(seed=seed)
+
+    known = RealisticPolicyConfig.__dataclass_fields__.keys()
+    policy_cfg = RealisticPolicyConfig(**{k: v for k, v in opts.items() if k in known})
+    return RealisticSpeakerPolicy(policy_cfg, seed=seed)
+
+
+# ------------------------------------------------------------
+# Termination: adaptive thread length + token budgets
+# ------------------------------------------------------------
+
+CLOSING_PHRASES = (
+    "thanks", "thank you", "thx", "appreciate", "that helps", "helpful",
+    "will try", "i'll try", "gonna try", "going to try", "good luck", "cheers",
+    "makes sense", "sounds good",
+)
+# Whole words only: "thanks" must not match inside "thanksgiving"
+_CLOSING_RE = re.compile(r"\b(?:" + "|".join(re.escape(p) for p in CLOSING_PHRASES) + r")\b")
+
+
+def estimate_tokens(*texts: str) -> int:
+    """
+    Cheap token estimate (~4 characters per token); good enough for budgeting.
+    """
+    return sum(len(t) for t in texts if t) // 4 + 1
+
+
+@dataclass
+class ThreadLengthTarget:
+    min: int = 2
+    mean: float = 4.0
+    max: int = 8
+
+    def sample(self, rng: random.Random, cap: int) -> int:
+        low = max(1, min(self.min, cap))
+        high = max(low, min(self.max, cap))
+        if low == high:
+            return low
+        # Triangular distribution whose mean matches the configured mean
+        mode = min(max(3 * self.mean - low - high, low), high)
+        return int(round(rng.triangular(low, high, mode)))
+
+
+class TokenBudget:
+    """
+    Per-week token budget shared by every thread of a calendar run.
+    Each new thread gets an equal share of what is left.
+
+    A thread always costs at least a post plus one comment (`thread_floor`).
+    Threads the remaining budget cannot cover are skipped instead of run,
+    so the budget is only exceeded by how much a thread's outputs run over
+    that floor. The floor starts as an estimate and then tracks the cheapest
+    thread actually run.
+    """
+
+    def __init__(self, limit: Optional[int], thread_floor: int = 0):
+        self.limit = limit
+        self.used = 0
+        self.thread_floor = thread_floor
+        self.threads_run = 0
+        self.threads_skipped = 0
+
+    @property
+    def remaining(self) -> Optional[int]:
+        if self.limit is None:
+            return None
+        return max(self.limit - self.used, 0)
+
+    def charge(self, tokens: int) -> None:
+        self.used += tokens
+
+    def charge_thread(self, tokens: int) -> None:
+        self.charge(tokens)
+        self.thread_floor = tokens if not self.threads_run else min(self.thread_floor, tokens)
+        self.threads_run += 1
+
+    def can_afford_thread(self) -> bool:
+        if self.limit is None:
+            return True
+        if self.remaining >= max(self.thread_floor, 1):
+            return True
+        self.threads_skipped += 1
+        return False
+
+    def thread_allowance(self, threads_left: int) -> Optional[int]:
+        if self.limit is None:
+            return None
+        return self.remaining // max(threads_left, 1)
+
+
+class TerminationPolicy:
+    """
+    Decides when a thread has run its course. A thread stops at the first of:
+    - the hard `max_comments` cap,
+    - its sampled target length (per-subreddit distribution),
+    - its share of the weekly token budget,
+    - a natural ending (OP thanks people or signs off) once `min` is reached.
+    """
+
+    def __init__(
+        self,
+        length_targets: Optional[Dict[str, ThreadLengthTarget]] = None,
+        natural_end_threshold: float = 0.7,
+    ):
+        self.length_targets = length_targets or {}
+        self.natural_end_threshold = natural_end_threshold
+
+    # ------------------------------------------------------------------
+    def target_for(self, subreddit: str) -> ThreadLengthTarget:
+        return (
+            self.length_targets.get(subreddit)
+            or self.length_targets.get(subreddit.replace("r/", ""))
+            or self.length_targets.get("default")
+            or ThreadLengthTarget()
+        )
+
+    def sample_length(self, subreddit: str, max_comments: int, rng: random.Random) -> int:
+        return self.target_for(subreddit).sample(rng, max_comments)
+
+    def natural_end_score(self, state) -> float:
+        """
+        Only OP can wrap a thread up; other commenters saying "helpful" or
+        "thanks" is just part of the conversation.
+        """
+        if not state.comments:
+            return 0.0
+        last = state.comments[-1]
+        if last.author != state.seed_username:
+            return 0.0
+        text = last.text.lower()
+
+        score = 0.2
+        if _CLOSING_RE.search(text):
+            score += 0.5
+        if "?" not in text:
+            score += 0.2
+        if len(text) < 200:
+            score += 0.1
+        return score
+
+    def _over_allowance(self, state) -> bool:
+        if state.token_allowance is None:
+            return False
+        # Stop if one more comment (at the running average cost) would not fit
+        per_comment = state.tokens_used // max(state.turn + 1, 1)
+        return state.tokens_used + per_comment > state.token_allowance
+
+    # ------------------------------------------------------------------
+    def should_stop(self, state) -> bool:
+        if state.turn >= state.max_comments:
+            return True
+        if self._over_allowance(state):
+            return True
+
+        target = state.target_length or state.max_comments
+        if state.turn >= target:
+            return True
+
+        minimum = self.target_for(state.subreddit).min
+        if state.turn >= minimum and self.natural_end_score(state) >= self.natural_end_threshold:
+            return True
+        return False
+
+
+def termination_policy_from_config(config: Dict[str, Any]) -> TerminationPolicy:
+    """
+    Reads per-subreddit length targets from the `thread_policy` block:
+
+        "thread_policy": {
+            "length_targets": {
+                "default": {"min": 2, "mean": 4, "max": 8},
+                "r/PowerPoint": {"min": 3, "mean": 5, "max": 10}
+            },
+            "natural_end_threshold": 0.7,
+            "weekly_token_budget": 60000
+        }
+    """
+    opts = config.get("thread_policy") or {}
+    targets = {
+        name: ThreadLengthTarget(**spec)
+        for name, spec in (opts.get("length_targets") or {}).items()
+    }
+    return TerminationPolicy(
+        length_targets=targets,
+        natural_end_threshold=opts.get("natural_end_threshold", 0.7),
+    )
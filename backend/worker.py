@@ -0,0 +1,241 @@
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import traceback
+from typing import Any, Dict, List, Optional
+
+from analytics import apply_coverage_deltas, thread_coverage_deltas
+from database import SessionLocal
+from persistence import insert_thread
+from run_manifest import config_hash
+from task_queue import (
+    DEFAULT_LEASE_SECONDS,
+    claim_task,
+    complete_task,
+    fail_exhausted_tasks,
+    fail_task,
+    renew_lease,
+)
+
+# ------------------------------------------------------------
+# Generation worker
+#
+# Pulls per-thread tasks queued by POST /enqueue-week from the
+# generation_tasks table, runs the conversation graph and saves the
+# thread through the models. Workers share nothing but the database,
+# so throughput grows with the number of worker processes/threads.
+#
+#   python worker.py                      # run forever
+#   python worker.py --threads 8          # 8 claim loops in one process
+#   python worker.py --drain              # exit once the queue is empty
+# ------------------------------------------------------------
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class LeaseKeeper(threading.Thread):
+    """
+    Renews a task's lease in the background while it is being generated.
+    `lost` is set if another worker reclaimed the task in the meantime.
+    """
+
+    def __init__(self, task_id: int, worker_id: str, lease_seconds: int):
+        super().__init__(daemon=True)
+        self.task_id = task_id
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds
+        self.lost = False
+        self._halt = threading.Event()
+
+    def run(self):
+        while not self._halt.wait(max(self.lease_seconds / 3, 1)):
+            db = SessionLocal()
+            try:
+                if not renew_lease(db, self.task_id, self.worker_id, self.lease_seconds):
+                    self.lost = True
+                    return
+            except Exception:
+                # Transient DB error: try again next tick, the lease has slack
+                db.rollback()
+            finally:
+                db.close()
+
+    def stop(self):
+        self._halt.set()
+        self.join()
+
+
+class LLMCache:
+    """
+    One TieredLLM per distinct config, shared by all claim loops in the process.
+    """
+
+    def __init__(self, llm: Optional[Any] = None):
+        self._fixed = llm
+        self._llms: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def get(self, config: Dict[str, Any]):
+        if self._fixed is not None:
+            return self._fixed
+        key = config_hash(config)
+        with self._lock:
+            if key not in self._llms:
+                from planning_engine import tiered_llm_from_config
+
+                self._llms[key] = tiered_llm_from_config(config)
+            return self._llms[key]
+
+
+def run_task(payload: Dict[str, Any], llm) -> Dict[str, Any]:
+    from planning_engine import generate_thread
+
+    entry, tokens_used = generate_thread(
+        payload["config"],
+        payload["assignment"],
+        llm,
+        max_comments_per_thread=payload.get("max_comments_per_thread", 6),
+        token_allowance=payload.get("token_allowance"),
+        engine=payload.get("engine", "langgraph"),
+    )
+    return {"entry": entry, "tokens_used": tokens_used}
+
+
+def save_and_complete(db, task_id: int, worker_id: str, result: Dict[str, Any]) -> bool:
+    """
+    Insert the thread and mark the task done in one transaction, only if
+    this worker still holds the lease. False (and nothing saved) otherwise.
+    """
+    post, coverage = insert_thread(db, result["entry"])
+    result["post_id"] = post.id
+    if not complete_task(db, task_id, worker_id, result, commit=False):
+        db.rollback()
+        return False
+    db.commit()
+
+    # Rollups are counters on top of saved rows; `analytics.py --rebuild` repairs a miss
+    apply_coverage_deltas(db, thread_coverage_deltas(post, coverage))
+    return True
+
+
+def process_one(
+    worker_id: str,
+    llms: LLMCache,
+    lease_seconds: int = DEFAULT_LEASE_SECONDS,
+) -> Optional[str]:
+    """
+    Claim and run a single task. Returns its final status, or None if the queue was empty.
+    """
+    db = SessionLocal()
+    try:
+        task = claim_task(db, worker_id, lease_seconds)
+        if task is None:
+            return None
+        task_id, payload = task.id, json.loads(task.payload)
+    finally:
+        db.close()
+
+    keeper = LeaseKeeper(task_id, worker_id, lease_seconds)
+    keeper.start()
+    db = SessionLocal()
+    try:
+        result = run_task(payload, llms.get(payload["config"]))
+        if keeper.lost:
+            return "lost"
+        return "done" if save_and_complete(db, task_id, worker_id, result) else "lost"
+    except Exception as e:
+        db.rollback()
+        print(f"[{worker_id}] task {task_id} failed: {e}", file=sys.stderr)
+        traceback.print_exc()
+        return fail_task(db, task_id, worker_id, f"{type(e).__name__}: {e}") or "lost"
+    finally:
+        keeper.stop()
+        db.close()
+
+
+def work_loop(
+    worker_id: str,
+    llms: LLMCache,
+    lease_seconds: int = DEFAULT_LEASE_SECONDS,
+    poll_interval: float = 2.0,
+    drain: bool = False,
+    stop: Optional[threading.Event] = None,
+) -> Dict[str, int]:
+    """
+    Keep claiming tasks until `stop` is set (or, with `drain`, until none are left).
+    """
+    stop = stop or threading.Event()
+    counts: Dict[str, int] = {}
+
+    while not stop.is_set():
+        status = process_one(worker_id, llms, lease_seconds)
+        if status is not None:
+            counts[status] = counts.get(status, 0) + 1
+            continue
+
+        db = SessionLocal()
+        try:
+            fail_exhausted_tasks(db)
+        finally:
+            db.close()
+        if drain:
+            break
+        stop.wait(poll_interval)
+
+    return counts
+
+
+def run_workers(
+    threads: int,
+    worker_id: str,
+    llm: Optional[Any] = None,
+    **loop_kwargs,
+) -> List[Dict[str, int]]:
+    """
+    Run `threads` independent claim loops (ids "<worker_id>/<n>") and wait for them.
+    """
+    llms = LLMCache(llm)
+    results: List[Dict[str, int]] = [{} for _ in range(threads)]
+
+    def target(n: int):
+        results[n] = work_loop(f"{worker_id}/{n}", llms, **loop_kwargs)
+
+    pool = [threading.Thread(target=target, args=(n,), daemon=True) for n in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run generation tasks from the database queue.")
+    parser.add_argument("--worker-id", default=default_worker_id())
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("OGTOOL_WORKER_THREADS", "4")),
+                        help="Concurrent claim loops in this process (LLM calls are I/O bound)")
+    parser.add_argument("--lease-seconds", type=int, default=DEFAULT_LEASE_SECONDS)
+    parser.add_argument("--poll-interval", type=float, default=2.0)
+    parser.add_argument("--drain", action="store_true", help="Exit when no tasks are left")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    print(f"Worker {args.worker_id} starting {args.threads} thread(s)...")
+    per_thread = run_workers(
+        args.threads,
+        args.worker_id,
+        lease_seconds=args.lease_seconds,
+        poll_interval=args.poll_interval,
+        drain=args.drain,
+    )
+
+    totals: Dict[str, int] = {}
+    for counts in per_thread:
+        for status, n in counts.items():
+            totals[status] = totals.get(status, 0) + n
+    print(f"Worker {args.worker_id} finished in {time.perf_counter() - started:.1f}s: {totals}")
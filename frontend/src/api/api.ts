@@ -29,24 +29,62 @@ export interface CalendarEntry {
   comments: RedditComment[];
 }
 
+// Idempotency keys
+
+// crypto.randomUUID only exists in secure contexts (HTTPS or localhost);
+// getRandomValues works everywhere, Math.random is the last resort.
+export const newIdempotencyKey = (): string => {
+  const c: Crypto | undefined = typeof crypto !== "undefined" ? crypto : undefined;
+  if (c && typeof c.randomUUID === "function") {
+    return c.randomUUID();
+  }
+
+  const bytes = new Uint8Array(16);
+  if (c && typeof c.getRandomValues === "function") {
+    c.getRandomValues(bytes);
+  } else {
+    for (let i = 0; i < bytes.length; i++) {
+      bytes[i] = Math.floor(Math.random() * 256);
+    }
+  }
+  bytes[6] = (bytes[6] & 0x0f) | 0x40; // version 4
+  bytes[8] = (bytes[8] & 0x3f) | 0x80; // RFC 4122 variant
+
+  const hex = Array.from(bytes, (b) => b.toString(16).padStart(2, "0")).join("");
+  return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`;
+};
+
 // API Calls
 
-export const generateWeek = async (payload: {
-  max_comments_per_thread: number;
-  start_date?: string;
-  override_posts_per_week?: number;
-}) => {
-  return API.post<CalendarEntry[]>("/generate-week", payload);
+// Without a key every call is a new submission (only the server's
+// single-flight merges concurrent duplicates). Callers that want safe
+// retries keep one key per submission and pass it again on retry.
+export const generateWeek = async (
+  payload: {
+    max_comments_per_thread: number;
+    start_date?: string;
+    override_posts_per_week?: number;
+  },
+  idempotencyKey: string = newIdempotencyKey()
+) => {
+  return API.post<CalendarEntry[]>("/generate-week", payload, {
+    headers: { "Idempotency-Key": idempotencyKey },
+  });
 };
 
-export const generateWeeksAndSave = async (payload: {
-  num_weeks: number;
-  output_dir: string;
-  max_comments_per_thread: number;
-}) => {
+export const generateWeeksAndSave = async (
+  payload: {
+    num_weeks: number;
+    output_dir: string;
+    max_comments_per_thread: number;
+  },
+  idempotencyKey: string = newIdempotencyKey()
+) => {
   return API.post<{
     status: string;
     weeks_generated: number;
     files: string[];
-  }>("/generate-weeks-and-save", payload);
+  }>("/generate-weeks-and-save", payload, {
+    headers: { "Idempotency-Key": idempotencyKey },
+  });
 };
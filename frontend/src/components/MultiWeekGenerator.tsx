@@ -1,24 +1,41 @@
-import { useState } from "react";
-import { generateWeeksAndSave } from "../api/api";
+import { useRef, useState } from "react";
+import { generateWeeksAndSave, newIdempotencyKey } from "../api/api";
 
 export default function MultiWeekGenerator() {
   const [weeks, setWeeks] = useState<number>(1);
   const [loading, setLoading] = useState(false);
+  // One Idempotency-Key per submission; kept after a network failure so
+  // clicking again retries the same request instead of generating twice
+  const submissionKey = useRef<string | null>(null);
   const [files, setFiles] = useState<string[]>([]);
 
   const handleGenerate = async () => {
     setLoading(true);
     setFiles([]);
 
+    if (!submissionKey.current) {
+      submissionKey.current = newIdempotencyKey();
+    }
+
     try {
-      const res = await generateWeeksAndSave({
-        num_weeks: weeks,
-        output_dir: "output_weeks",
-        max_comments_per_thread: 6,
-      });
+      const res = await generateWeeksAndSave(
+        {
+          num_weeks: weeks,
+          output_dir: "output_weeks",
+          max_comments_per_thread: 6,
+        },
+        submissionKey.current
+      );
 
+      submissionKey.current = null;
       setFiles(res.data.files);
     } catch (err: any) {
+      // The server rejected the request (4xx), so the next click is a new
+      // submission; keep the key after a 5xx or network error so a retry
+      // gets the stored result instead of generating again
+      if (err.response && err.response.status < 500) {
+        submissionKey.current = null;
+      }
       alert(err.message || "Error generating weeks");
     }
 
@@ -35,7 +52,11 @@ export default function MultiWeekGenerator() {
         min={1}
         max={52}
         value={weeks}
-        onChange={(e) => setWeeks(Number(e.target.value))}
+        onChange={(e) => {
+          // A different payload is a different submission
+          submissionKey.current = null;
+          setWeeks(Number(e.target.value));
+        }}
       />
 
       <br />
@@ -1,21 +1,38 @@
-import { useState } from "react";
-import { generateWeek, CalendarEntry } from "../api/api";
+import { useRef, useState } from "react";
+import { generateWeek, newIdempotencyKey, CalendarEntry } from "../api/api";
 import JsonViewer from "./JsonViewer";
 
 export default function WeekGenerator() {
   const [loading, setLoading] = useState(false);
+  // One Idempotency-Key per submission; kept after a network failure so
+  // clicking again retries the same request instead of generating twice
+  const submissionKey = useRef<string | null>(null);
   const [result, setResult] = useState<CalendarEntry[] | null>(null);
 
   const handleGenerate = async () => {
     setLoading(true);
     setResult(null);
 
+    if (!submissionKey.current) {
+      submissionKey.current = newIdempotencyKey();
+    }
+
     try {
-      const res = await generateWeek({
-        max_comments_per_thread: 6,
-      });
+      const res = await generateWeek(
+        {
+          max_comments_per_thread: 6,
+        },
+        submissionKey.current
+      );
+      submissionKey.current = null;
       setResult(res.data);
     } catch (err: any) {
+      // The server rejected the request (4xx), so the next click is a new
+      // submission; keep the key after a 5xx or network error so a retry
+      // gets the stored result instead of generating again
+      if (err.response && err.response.status < 500) {
+        submissionKey.current = null;
+      }
       alert(err.message || "Error generating week");
     }
 